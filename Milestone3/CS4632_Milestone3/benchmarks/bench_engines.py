@@ -0,0 +1,44 @@
+"""Events/sec of the SimPy engine against the heap event-calendar engine
+
+Run from the project folder:  python -m benchmarks.bench_engines
+"""
+import contextlib
+import io
+import tempfile
+import time
+
+from benchmarks.common import ModelEventCounter, ed_config
+from hospital_simulation.engines import ENGINES
+
+ARRIVAL_RATES = [0.05, 0.1, 0.15, 0.19]  # Doctors saturate at 3 x 0.067 = 0.2
+SIMULATION_TIME = 200_000
+
+
+def time_engine(engine, arrival_rate, output_directory):
+    """Simulate one horizon and return (model events, patients completed, seconds)"""
+    config = ed_config(SIMULATION_TIME, output_directory=output_directory,
+                       arrival_rate=arrival_rate, record_queue_history=False)
+    simulation = ENGINES[engine](config)
+    counter = ModelEventCounter(simulation)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        simulation.simulate(SIMULATION_TIME)
+        elapsed = time.perf_counter() - start
+    return counter.events, len(simulation.run_data['patients']), elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as output_directory:
+        print(f"{'arrival rate':>12} {'engine':>7} {'events/s':>12} {'patients/s':>12} {'speedup':>8}")
+        for arrival_rate in ARRIVAL_RATES:
+            baseline = None
+            for engine in ENGINES:
+                events, patients, elapsed = time_engine(engine, arrival_rate, output_directory)
+                events_per_second = events / elapsed
+                baseline = baseline or events_per_second
+                print(f"{arrival_rate:>12} {engine:>7} {events_per_second:>12,.0f} "
+                      f"{patients / elapsed:>12,.0f} {events_per_second / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
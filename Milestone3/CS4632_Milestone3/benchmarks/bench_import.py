@@ -0,0 +1,43 @@
+"""Cold import time of the simulation core, and which heavy libraries it pulls in
+
+Run from the project folder:  python -m benchmarks.bench_import
+"""
+import json
+import subprocess
+import sys
+
+MODULES = ['hospital_simulation.engines', 'run_manager']
+HEAVY_MODULES = ['pandas', 'matplotlib', 'scipy']
+REPEATS = 5
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def time_import(module, repeats=REPEATS):
+    """Fastest cold import of `module` over fresh interpreters, and the heavy modules it loaded"""
+    script = IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def main():
+    print(f"{'module':<30} {'import':>10}  heavy modules loaded")
+    for module in MODULES:
+        result = time_import(module)
+        loaded = ', '.join(result['loaded']) or 'none'
+        print(f"{module:<30} {result['seconds'] * 1000:>8.1f}ms  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
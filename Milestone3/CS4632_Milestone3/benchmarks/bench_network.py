@@ -0,0 +1,59 @@
+"""Scaling of the multi-department network mode with the number of departments
+
+Each network size runs in a fresh process; per-event cost and the peak memory
+added per department should stay roughly flat as the network grows.
+
+Run from the project folder:  python -m benchmarks.bench_network [--horizon MINUTES]
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+
+from benchmarks.common import ed_config
+from benchmarks.suite import peak_rss_mb
+
+NETWORK_SIZES = [25, 50, 100, 200, 400]
+DEFAULT_HORIZON = 2_000
+DOCTOR_LOAD = 0.85
+
+
+def time_network(num_departments, horizon):
+    """Setup and simulate one network; returns (events, patients, setup s, simulate s, peak MB added)"""
+    from hospital_simulation.network import NetworkSimulation
+
+    with tempfile.TemporaryDirectory() as output_directory:
+        config = ed_config(horizon, DOCTOR_LOAD, output_directory, verbosity=0,
+                           network={'num_departments': num_departments})
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        simulation = NetworkSimulation(config)
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        simulation.simulate(horizon)
+        elapsed = time.perf_counter() - start
+        return simulation.telemetry.events, simulation.patients_completed(), setup, elapsed, peak_rss_mb() - baseline
+
+
+def run_isolated(num_departments, horizon):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(time_network, (num_departments, horizon))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--horizon', type=float, default=DEFAULT_HORIZON, help="simulated minutes per network")
+    args = parser.parse_args(argv)
+
+    print(f"{'departments':>11} {'events':>10} {'setup s':>8} {'events/s':>10} {'us/event':>9} "
+          f"{'peak MB':>8} {'KB/dept':>8}")
+    for num_departments in NETWORK_SIZES:
+        events, patients, setup, elapsed, peak = run_isolated(num_departments, args.horizon)
+        print(f"{num_departments:>11} {events:>10,} {setup:>8.3f} {events / elapsed:>10,.0f} "
+              f"{elapsed / events * 1e6:>9.2f} {peak:>8.1f} {peak * 1024 / num_departments:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Trace-driven replay against synthetic arrivals, and trace reader throughput
+
+Writes a synthetic trace (CSV and its .npy conversion), then times runs over
+the same horizon with sampled arrivals and with each trace format, and a full
+read of each file. Every case runs in a fresh process, so the peak memory it
+adds shows whether the whole trace was loaded.
+
+Run from the project folder:  python -m benchmarks.bench_trace [--rows N] [--horizon MINUTES]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import ed_config
+from benchmarks.suite import peak_rss_mb
+
+DEFAULT_ROWS = 2_000_000
+DEFAULT_HORIZON = 200_000
+DOCTOR_LOAD = 0.8
+
+
+def write_trace(path, rows, arrival_rate, seed=7):
+    """CSV trace of Poisson arrivals with recorded service times, written in chunks"""
+    generator = np.random.default_rng(seed)
+    weights = np.array([0.05, 0.1, 0.35, 0.4, 0.1])
+    time_offset = 0.0
+    with open(path, 'w') as trace:
+        trace.write('arrival_time,triage_level,triage_time,treatment_time\n')
+        for start in range(0, rows, 500_000):
+            count = min(500_000, rows - start)
+            times = time_offset + np.cumsum(generator.exponential(1 / arrival_rate, count))
+            time_offset = times[-1]
+            columns = np.column_stack([times, generator.choice(np.arange(1, 6), count, p=weights),
+                                       generator.exponential(5, count), generator.exponential(15, count)])
+            np.savetxt(trace, columns, fmt=['%.6f', '%d', '%.6f', '%.6f'], delimiter=',')
+
+
+def time_case(case, trace_path, horizon):
+    """(seconds, patients, peak MB added) for one case, run in this process"""
+    from hospital_simulation.engines import create_simulation
+    from hospital_simulation.trace import read_trace
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if case.startswith('read'):
+        patients = sum(len(chunk) for chunk in read_trace(trace_path))
+    else:
+        with tempfile.TemporaryDirectory() as output_directory:
+            config = ed_config(horizon, DOCTOR_LOAD, output_directory, engine='heap', verbosity=0,
+                              metrics_mode='online', record_queue_history=False, common_random_numbers=True)
+            if trace_path is not None:
+                config['trace'] = {'path': trace_path}
+            with contextlib.redirect_stdout(io.StringIO()):
+                patients = create_simulation(config).run(1)['total_patients']
+    return time.perf_counter() - start, patients, peak_rss_mb() - baseline
+
+
+def run_isolated(case, trace_path, horizon):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(time_case, (case, trace_path, horizon))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="arrivals in the generated trace")
+    parser.add_argument('--horizon', type=float, default=DEFAULT_HORIZON, help="simulated minutes per run")
+    args = parser.parse_args(argv)
+
+    from hospital_simulation.trace import convert
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path, npy_path = Path(directory) / 'trace.csv', Path(directory) / 'trace.npy'
+        arrival_rate = ed_config(args.horizon, DOCTOR_LOAD)['arrival_rate']
+        write_trace(csv_path, args.rows, arrival_rate)
+        start = time.perf_counter()
+        convert(csv_path, npy_path)
+        print(f"Trace: {args.rows:,} rows, {csv_path.stat().st_size / 2**20:.0f} MB CSV, "
+              f"converted in {time.perf_counter() - start:.1f} s")
+
+        cases = [('synthetic', None), ('replay csv', str(csv_path)), ('replay npy', str(npy_path)),
+                 ('read csv', str(csv_path)), ('read npy', str(npy_path))]
+        print(f"{'case':>12} {'seconds':>8} {'patients':>10} {'per s':>11} {'peak MB':>8}")
+        for case, path in cases:
+            seconds, patients, peak = run_isolated(case, path, args.horizon)
+            print(f"{case:>12} {seconds:>8.2f} {patients:>10,} {patients / seconds:>11,.0f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
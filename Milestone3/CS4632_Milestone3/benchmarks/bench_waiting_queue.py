@@ -0,0 +1,91 @@
+"""Micro-benchmark for WaitingQueue add/get cost at increasing queue depths
+
+Every patient has the same triage level, so the whole backlog sits in the level
+being popped: that is where the list queue's pop(0) pays for the queue depth.
+
+Run from the project folder:  python -m benchmarks.bench_waiting_queue
+"""
+import time
+
+from hospital_simulation.patient import Patient
+from hospital_simulation.waiting_queue import WaitingQueue
+
+DEPTHS = [10, 1_000, 10_000, 100_000]
+OPERATIONS = 20_000
+
+
+class ListWaitingQueue:
+    """The previous list-based queue, kept here as a reference point"""
+
+    def __init__(self):
+        self.queues = {1: [], 2: [], 3: [], 4: [], 5: []}
+        self.queue_history = []
+
+    def add_patient(self, patient, current_time=None):
+        self.queues[patient.triage_level].append(patient)
+        if current_time is not None:
+            self.record_queue_state(current_time)
+
+    def get_next_patient(self, current_time=None):
+        for level in range(1, 6):
+            if self.queues[level]:
+                patient = self.queues[level].pop(0)
+                if current_time is not None:
+                    self.record_queue_state(current_time)
+                return patient
+        return None
+
+    def record_queue_state(self, current_time):
+        self.queue_history.append({
+            'time': current_time,
+            'queue_1_length': len(self.queues[1]),
+            'queue_2_length': len(self.queues[2]),
+            'queue_3_length': len(self.queues[3]),
+            'queue_4_length': len(self.queues[4]),
+            'queue_5_length': len(self.queues[5]),
+            'total_queue_length': sum(len(q) for q in self.queues.values())
+        })
+
+
+BACKLOG_LEVEL = 3
+
+
+def make_patients(count):
+    patients = []
+    for patient_id in range(count):
+        patient = Patient(patient_id, 0.0)
+        patient.set_triage_level(BACKLOG_LEVEL)
+        patients.append(patient)
+    return patients
+
+
+def time_steady_state(queue, depth, patients):
+    """Hold the queue at `depth` and time alternating add/get pairs, in ns per operation
+
+    No time is passed, so the queue-history bookkeeping (the same cost for both
+    queues) stays out of the measurement.
+    """
+    for patient in patients[:depth]:
+        queue.add_patient(patient)
+
+    incoming = patients[depth:depth + OPERATIONS]
+    start = time.perf_counter()
+    for patient in incoming:
+        queue.add_patient(patient)
+        queue.get_next_patient()
+    elapsed = time.perf_counter() - start
+    return elapsed / (2 * len(incoming)) * 1e9
+
+
+def main():
+    patients = make_patients(max(DEPTHS) + OPERATIONS)
+
+    print(f"{'depth':>10} {'deque ns/op':>14} {'list ns/op':>14}")
+    for depth in DEPTHS:
+        deque_cost = time_steady_state(WaitingQueue(verbose=False), depth, patients)
+        list_cost = time_steady_state(ListWaitingQueue(), depth, patients)
+        print(f"{depth:>10} {deque_cost:>14.0f} {list_cost:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
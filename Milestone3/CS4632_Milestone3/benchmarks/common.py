@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts"""
+
+
+def ed_config(simulation_time, doctor_load=0.5, output_directory='benchmark_runs', **overrides):
+    """Baseline ED config with the arrival rate set for the given doctor utilization"""
+    config = {
+        'simulation_time': simulation_time,
+        'num_triage_nurses': 2,
+        'num_doctors': 3,
+        'triage_rate': 0.2,
+        'treatment_rate': 0.067,
+        'output_directory': output_directory,
+    }
+    config['arrival_rate'] = doctor_load * config['num_doctors'] * config['treatment_rate']
+    config.update(overrides)
+    return config
+
+
+class ModelEventCounter:
+    """Counts record_event calls (six model events per patient) on either engine"""
+
+    def __init__(self, simulation):
+        self.events = 0
+        self.record_event = simulation.record_event
+        simulation.record_event = self
+
+    def __call__(self, event_type, patient):
+        self.events += 1
+        self.record_event(event_type, patient)
@@ -0,0 +1,208 @@
+"""Performance benchmark suite with JSON regression baselines
+
+Each case runs in a fresh process so peak RSS belongs to that case alone.
+
+Run from the project folder:
+    python -m benchmarks.suite --save-baseline     # record benchmarks/baselines.json
+    python -m benchmarks.suite                     # compare, exit 1 on a regression
+
+Baselines are machine-specific, so none is committed: record one on the
+machine that runs the check. Without a baseline, or with cases missing from
+it, the comparison exits 2 rather than passing vacuously.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from benchmarks.common import ModelEventCounter, ed_config
+
+BASELINE_FILE = Path(__file__).with_name('baselines.json')
+HORIZONS = [480, 10_000, 100_000, 1_000_000]
+DOCTOR_LOADS = [0.5, 0.8, 0.95]
+QUEUE_DEPTH = 10_000
+DEFAULT_THRESHOLD = 0.25
+REPEAT_HORIZON = 50_000  # Horizons shorter than this are repeated...
+MAX_REPEATS = 20         # ...up to this many times, keeping the fastest
+
+# Measurements checked against the baseline, and whether larger is better
+CHECKED_MEASUREMENTS = {
+    'events_per_second': True,
+    'patients_per_second': True,
+    'queue_ns_per_operation': False,
+    'peak_rss_mb': False,
+    'import_seconds': False,
+}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_run_phases(engine, horizon, doctor_load):
+    """Time the phases of one run: simulate, metrics, export"""
+    from hospital_simulation.engines import create_simulation
+
+    with tempfile.TemporaryDirectory() as output_directory:
+        config = ed_config(horizon, doctor_load, output_directory, engine=engine)
+        simulation = create_simulation(config)
+        counter = ModelEventCounter(simulation)
+        phases = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            simulation.simulate(horizon)
+            if config['utilization_mode'] == 'exact':
+                simulation.collect_time_weighted_stats()
+            phases['simulate'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            simulation.calculate_system_metrics()
+            phases['metrics'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            simulation.export_data(1)
+            phases['export'] = time.perf_counter() - start
+    return counter.events, len(simulation.run_data['patients']), phases
+
+
+def run_simulation_case(engine, horizon, doctor_load):
+    """Best-of-N phase times (more repeats for short horizons, where timings are noisy)"""
+    repeats = min(MAX_REPEATS, max(1, int(REPEAT_HORIZON // horizon)))
+    events, patients, phases = time_run_phases(engine, horizon, doctor_load)
+    for _ in range(repeats - 1):
+        _, _, repeat_phases = time_run_phases(engine, horizon, doctor_load)
+        phases = {phase: min(seconds, repeat_phases[phase]) for phase, seconds in phases.items()}
+
+    return {
+        'events': events,
+        'patients': patients,
+        'repeats': repeats,
+        'events_per_second': events / phases['simulate'],
+        'patients_per_second': patients / phases['simulate'],
+        'phase_seconds': phases,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_queue_case(depth):
+    """WaitingQueue cost per add/get at a steady queue depth"""
+    from benchmarks.bench_waiting_queue import OPERATIONS, make_patients, time_steady_state
+    from hospital_simulation.waiting_queue import WaitingQueue
+
+    patients = make_patients(depth + OPERATIONS)
+    return {
+        'queue_ns_per_operation': time_steady_state(WaitingQueue(verbose=False), depth, patients),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_import_case(module):
+    """Cold import time of the simulation core (pandas must stay off this path)"""
+    from benchmarks.bench_import import time_import
+
+    result = time_import(module)
+    return {'import_seconds': result['seconds'], 'heavy_modules_loaded': result['loaded']}
+
+
+def benchmark_cases(engine, max_horizon):
+    cases = {'import_engines': (run_import_case, ('hospital_simulation.engines',)),
+             f"queue_depth_{QUEUE_DEPTH}": (run_queue_case, (QUEUE_DEPTH,))}
+    for horizon in HORIZONS:
+        if horizon > max_horizon:
+            continue
+        for load in DOCTOR_LOADS:
+            cases[f"{engine}_t{horizon}_load{round(load * 100)}"] = (run_simulation_case, (engine, horizon, load))
+    return cases
+
+
+def run_isolated(function, args):
+    """Run one case in a fresh worker process"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(function, args)
+
+
+def find_regressions(results, baselines, threshold):
+    """List measurements that got worse than the baseline by more than `threshold`"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        for measurement, higher_is_better in CHECKED_MEASUREMENTS.items():
+            current = result.get(measurement)
+            reference = baseline.get(measurement)
+            if current is None or reference is None or reference == 0:
+                continue
+            change = (current - reference) / reference
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{name}: {measurement} {reference:.4g} -> {current:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', default='simpy', help="simulation engine to benchmark (simpy or heap)")
+    parser.add_argument('--max-horizon', type=float, default=max(HORIZONS), help="skip longer horizons")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown or memory growth before failing")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    if not args.save_baseline and not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        return 2
+
+    results = {}
+    for name, (function, case_args) in benchmark_cases(args.engine, args.max_horizon).items():
+        results[name] = run_isolated(function, case_args)
+        result = results[name]
+        if 'events_per_second' in result:
+            phases = ', '.join(f"{phase} {seconds:.3f}s" for phase, seconds in result['phase_seconds'].items())
+            print(f"{name:<28} {result['events_per_second']:>10,.0f} events/s "
+                  f"{result['patients_per_second']:>9,.0f} patients/s  {result['peak_rss_mb']:>6.0f} MB  ({phases})")
+        elif 'import_seconds' in result:
+            loaded = ', '.join(result['heavy_modules_loaded']) or 'no heavy modules'
+            print(f"{name:<28} {result['import_seconds'] * 1000:>10,.1f} ms import  ({loaded})")
+        else:
+            print(f"{name:<28} {result['queue_ns_per_operation']:>10,.0f} ns/op  {result['peak_rss_mb']:>6.0f} MB")
+
+    if args.save_baseline:
+        baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baselines.update(results)
+        args.baseline.write_text(json.dumps(baselines, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baselines = json.loads(args.baseline.read_text())
+    regressions = find_regressions(results, baselines, args.threshold)
+    missing = [name for name in results if name not in baselines]
+    if regressions:
+        print("\nPerformance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    if missing:
+        print(f"\nNot in the baseline, so not checked: {', '.join(missing)}; re-run with --save-baseline",
+              file=sys.stderr)
+        return 2
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
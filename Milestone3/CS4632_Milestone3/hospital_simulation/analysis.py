@@ -0,0 +1,181 @@
+"""Cross-run analysis of a sweep's metrics.json files
+
+load_runs() reads the metrics.json of every run in the sweep's
+all_runs_summary.csv in bulk into two flat tables: one row per run, and one
+row per (run, triage level) from the nested
+metrics_by_triage_level. Each table is built in a single DataFrame
+construction. summarize() then computes the mean, t confidence interval and
+quantiles of every metric per scenario (and per triage level) with grouped
+aggregations, and write_report() writes the CSVs and the text report once.
+
+Run from the project folder:  python -m hospital_simulation.analysis [simulation_runs_m3]
+"""
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from hospital_simulation.confidence import t_quantile
+from hospital_simulation.enhanced_simulation import run_directory_name
+
+DEFAULT_DIRECTORY = 'simulation_runs_m3'
+SUMMARY_FILE = 'all_runs_summary.csv'
+SCENARIO_KEYS = ['run_id', 'purpose']
+CONFIG_COLUMNS = ['replication', 'purpose', 'arrival_rate', 'num_triage_nurses', 'num_doctors',
+                  'triage_rate', 'treatment_rate', 'simulation_time']
+RUN_METRICS = ['avg_total_time', 'avg_wait_for_triage', 'avg_wait_for_treatment', 'avg_doctor_utilization',
+               'avg_triage_utilization', 'throughput', 'total_patients_processed']
+LEVEL_METRICS = ['avg_total_time', 'avg_wait_for_treatment', 'max_wait_for_treatment', 'avg_queue_length']
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def _read_records(paths):
+    """Run and triage-level records of some metrics.json files (top-level so worker processes can pickle it)"""
+    runs, levels = [], []
+    for path in paths:
+        data = json.loads(Path(path).read_bytes())
+        config = data.get('config', {})
+        system_metrics = data.get('system_metrics', {})
+        run = {'run_id': data['run_id']}
+        run.update({name: config.get(name) for name in CONFIG_COLUMNS})
+        run['purpose'] = run['purpose'] or ''
+        run['replication'] = run['replication'] or 0
+        run.update({name: value for name, value in system_metrics.items() if isinstance(value, (int, float))})
+        runs.append(run)
+        for level, level_metrics in system_metrics.get('metrics_by_triage_level', {}).items():
+            levels.append({'run_id': run['run_id'], 'replication': run['replication'], 'purpose': run['purpose'],
+                           'triage_level': int(level), **level_metrics})
+    return runs, levels
+
+
+def sweep_paths(directory=DEFAULT_DIRECTORY):
+    """metrics.json paths of the runs listed in <directory>/all_runs_summary.csv
+
+    Run folders left behind by earlier, larger sweeps into the same directory
+    are not part of the last sweep, so they are skipped. Without a summary,
+    every <directory>/*/metrics.json is read.
+    """
+    import pandas as pd
+    directory = Path(directory)
+    if not (directory / SUMMARY_FILE).exists():
+        return sorted(str(path) for path in directory.glob('*/metrics.json'))
+    # Scenarios the pre-screen skipped are listed without a replication
+    keys = pd.read_csv(directory / SUMMARY_FILE, usecols=['run_id', 'replication']).dropna()
+    # Replicated sweeps name their folders per replication
+    num_replications = 2 if (keys['replication'] > 0).any() else 1
+    paths = []
+    for run_id, replication in keys.itertuples(index=False):
+        config = {'num_replications': num_replications, 'replication': int(replication)}
+        path = directory / run_directory_name(config, int(run_id)) / 'metrics.json'
+        if not path.exists() and num_replications == 1:
+            # A replicated sweep that only ran replication 0 (e.g. adaptive with one replication)
+            path = directory / run_directory_name({**config, 'num_replications': 2}, int(run_id)) / 'metrics.json'
+        if path.exists():
+            paths.append(str(path))
+    return sorted(paths)
+
+
+def load_runs(directory=DEFAULT_DIRECTORY, num_workers=1):
+    """(runs, levels) DataFrames from the metrics.json of every run in the directory's last sweep"""
+    import pandas as pd
+    paths = sweep_paths(directory)
+    if num_workers > 1 and len(paths) > num_workers:
+        batches = [paths[index::num_workers * 4] for index in range(num_workers * 4)]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = list(executor.map(_read_records, batches))
+    else:
+        results = [_read_records(paths)]
+    runs = pd.DataFrame.from_records([run for batch_runs, _ in results for run in batch_runs])
+    levels = pd.DataFrame.from_records([level for _, batch_levels in results for level in batch_levels])
+    if not runs.empty:
+        runs = runs.sort_values(['run_id', 'replication'], ignore_index=True)
+    if not levels.empty:
+        levels = levels.sort_values(['run_id', 'replication', 'triage_level'], ignore_index=True)
+    return runs, levels
+
+
+def summarize(frame, metrics, keys=SCENARIO_KEYS, confidence=0.95, quantiles=DEFAULT_QUANTILES):
+    """Per-group replications, mean, CI half-width and quantiles of each metric
+
+    Columns are <metric>_mean, <metric>_half_width and <metric>_p<q>; the
+    half-width is inf for groups with a single replication.
+    """
+    import pandas as pd
+    metrics = [metric for metric in metrics if metric in frame]
+    grouped = frame.groupby(keys, sort=True)[metrics]
+    counts = grouped.count()
+    means = grouped.mean()
+    deviations = grouped.std()
+
+    # One t quantile per distinct replication count, broadcast over every group and metric
+    critical = {count: t_quantile(0.5 + confidence / 2, count - 1) if count > 1 else np.inf
+                for count in np.unique(counts.to_numpy())}
+    t_values = np.vectorize(critical.get, otypes=[np.float64])(counts.to_numpy())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        half_widths = t_values * deviations.to_numpy() / np.sqrt(counts.to_numpy())
+    # The sample deviation is NaN below two values; the interval is unbounded there
+    half_widths[counts.to_numpy() < 2] = np.inf
+
+    columns = {'replications': grouped.size()}
+    quantile_values = grouped.quantile(list(quantiles))
+    for index, metric in enumerate(metrics):
+        columns[f"{metric}_mean"] = means[metric]
+        columns[f"{metric}_half_width"] = pd.Series(half_widths[:, index], index=means.index)
+        for quantile in quantiles:
+            columns[f"{metric}_p{quantile * 100:02.0f}"] = quantile_values[metric].xs(quantile, level=-1)
+    return pd.DataFrame(columns).reset_index()
+
+
+def write_report(runs, levels, output_directory, confidence=0.95, quantiles=DEFAULT_QUANTILES):
+    """Write scenario and triage-level summaries as CSV plus one text report; returns both summaries"""
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    scenarios = summarize(runs, RUN_METRICS, SCENARIO_KEYS, confidence, quantiles)
+    by_level = summarize(levels, LEVEL_METRICS, SCENARIO_KEYS + ['triage_level'], confidence, quantiles)
+    scenarios.to_csv(output_directory / 'scenario_summary.csv', index=False)
+    by_level.to_csv(output_directory / 'triage_level_summary.csv', index=False)
+
+    def ci_table(summary, keys, metrics):
+        # "mean ± half-width" columns; formatting first keeps NaN and inf readable instead of propagating
+        table = summary[keys + ['replications']].copy()
+        for metric in metrics:
+            if f"{metric}_mean" in summary:
+                table[metric] = (summary[f"{metric}_mean"].map('{:.2f}'.format) + " ± "
+                                 + summary[f"{metric}_half_width"].map('{:.2f}'.format))
+        return table.to_string(index=False)
+
+    report = "\n".join([
+        f"CROSS-RUN ANALYSIS: {len(runs)} runs, {runs['run_id'].nunique()} scenarios ({confidence:.0%} CI)",
+        "=" * 60,
+        ci_table(scenarios, SCENARIO_KEYS, ['avg_total_time', 'avg_wait_for_treatment', 'avg_doctor_utilization']),
+        "",
+        "BY TRIAGE LEVEL",
+        "=" * 60,
+        ci_table(by_level, SCENARIO_KEYS + ['triage_level'], ['avg_wait_for_treatment', 'max_wait_for_treatment']),
+        "",
+    ])
+    (output_directory / 'report.txt').write_text(report, encoding='utf-8')
+    return scenarios, by_level
+
+
+def analyze_sweep(directory=DEFAULT_DIRECTORY, output_directory=None, num_workers=1, confidence=0.95):
+    """Load a sweep's runs and write its analysis to <directory>/analysis; returns the summaries"""
+    runs, levels = load_runs(directory, num_workers)
+    if runs.empty:
+        raise FileNotFoundError(f"No metrics.json found under {directory}")
+    return write_report(runs, levels, output_directory or Path(directory) / 'analysis', confidence)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a sweep's runs per scenario and triage level")
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DIRECTORY)
+    parser.add_argument('--workers', type=int, default=1, help="processes reading metrics.json files")
+    args = parser.parse_args(argv)
+    analyze_sweep(args.directory, num_workers=args.workers)
+    print((Path(args.directory) / 'analysis' / 'report.txt').read_text(encoding='utf-8'))
+
+
+if __name__ == "__main__":
+    main()
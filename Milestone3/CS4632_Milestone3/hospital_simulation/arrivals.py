@@ -0,0 +1,99 @@
+"""Piecewise-constant arrival rate schedules for non-homogeneous Poisson arrivals
+
+Set config['arrival_schedule'] to make the arrival rate follow a daily or
+weekly cycle instead of the constant arrival_rate, e.g. four six-hour blocks
+repeating every day:
+
+    "arrival_schedule": {"times": [0, 360, 720, 1080],
+                         "rates": [0.04, 0.12, 0.15, 0.09],
+                         "period": 1440}
+
+or one rate per hour ("rates" with 24 values and "segment_length": 60). Rates
+are patients per minute; without a period the last rate holds forever.
+"""
+import numpy as np
+
+
+class RateSchedule:
+    """Piecewise-constant rate with a precomputed cumulative intensity table
+
+    cumulative() and inverse() are vectorized table lookups (np.searchsorted),
+    so mapping a block of unit-rate arrival epochs to arrival times costs the
+    same whatever the rate; zero-rate segments are skipped by the lookup.
+    """
+
+    def __init__(self, times, rates, period=None):
+        self.starts = np.asarray(times, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.period = float(period) if period else None
+        if len(self.starts) != len(self.rates) or len(self.rates) == 0:
+            raise ValueError("arrival_schedule needs one rate per segment start time")
+        if self.starts[0] != 0 or np.any(np.diff(self.starts) <= 0):
+            raise ValueError("arrival_schedule times must start at 0 and increase")
+        if np.any(self.rates < 0):
+            raise ValueError("arrival_schedule rates must not be negative")
+        if self.period is not None and self.period <= self.starts[-1]:
+            raise ValueError("arrival_schedule period must end after the last segment starts")
+
+        # Cumulative intensity at each segment start, and over a whole period
+        widths = np.diff(np.append(self.starts, self.period if self.period else np.inf))
+        self.cumulative_starts = np.concatenate(([0.0], np.cumsum(self.rates[:-1] * widths[:-1])))
+        self.period_intensity = None
+        if self.period is not None:
+            self.period_intensity = self.cumulative_starts[-1] + self.rates[-1] * widths[-1]
+            if self.period_intensity <= 0:
+                raise ValueError("arrival_schedule has no arrivals in a period")
+
+    @classmethod
+    def from_config(cls, config):
+        """Schedule from config['arrival_schedule'], or None for a constant arrival_rate"""
+        options = config.get('arrival_schedule')
+        if not options:
+            return None
+        rates = options['rates']
+        times = options.get('times')
+        if times is None:
+            times = [index * options.get('segment_length', 60) for index in range(len(rates))]
+        return cls(times, rates, options.get('period'))
+
+    def cumulative(self, time):
+        """Expected arrivals from 0 to `time` (scalar or array)"""
+        time = np.asarray(time, dtype=np.float64)
+        cycles = 0.0
+        if self.period is not None:
+            cycles, time = np.divmod(time, self.period)
+        segment = np.searchsorted(self.starts, time, side='right') - 1
+        intensity = self.cumulative_starts[segment] + self.rates[segment] * (time - self.starts[segment])
+        if self.period is not None:
+            intensity = intensity + cycles * self.period_intensity
+        return intensity
+
+    def inverse(self, intensity):
+        """Time at which the cumulative intensity reaches `intensity` (scalar or array)"""
+        intensity = np.asarray(intensity, dtype=np.float64)
+        cycles = 0.0
+        if self.period is not None:
+            cycles = np.floor(intensity / self.period_intensity)
+            intensity = intensity - cycles * self.period_intensity
+        # side='right' lands past zero-rate segments, whose cumulative intensity is flat
+        segment = np.searchsorted(self.cumulative_starts, intensity, side='right') - 1
+        rates = self.rates[segment]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            offset = np.where(rates > 0, (intensity - self.cumulative_starts[segment]) / rates, np.inf)
+        time = self.starts[segment] + offset
+        if self.period is not None:
+            time = time + cycles * self.period
+        return time
+
+
+def scaled_schedule(options, factor):
+    """Copy of an arrival_schedule config with every rate multiplied by `factor`"""
+    return {**options, 'rates': [rate * factor for rate in options['rates']]}
+
+
+def expected_arrivals(config):
+    """Expected arrivals over config['simulation_time'] (for sizing stores)"""
+    schedule = RateSchedule.from_config(config)
+    if schedule is None:
+        return config['arrival_rate'] * config['simulation_time']
+    return float(schedule.cumulative(config['simulation_time']))
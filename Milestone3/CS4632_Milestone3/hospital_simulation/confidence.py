@@ -0,0 +1,113 @@
+import math
+from functools import lru_cache
+from statistics import NormalDist
+
+# Below this many degrees of freedom the t quantile is found exactly; the expansion is too narrow in the tails
+EXACT_T_DEGREES = 30
+
+
+def _incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), by Lentz's continued fraction"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        # The continued fraction converges fast only below this point
+        return 1.0 - _incomplete_beta(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * fraction / a
+
+
+def t_upper_tail(t, degrees_of_freedom):
+    """P(T > t) for Student's t and t >= 0"""
+    v = degrees_of_freedom
+    return 0.5 * _incomplete_beta(v / 2, 0.5, v / (v + t * t))
+
+
+@lru_cache(maxsize=1024)
+def t_quantile(probability, degrees_of_freedom):
+    """Student-t quantile
+
+    Exact below EXACT_T_DEGREES degrees of freedom (bisection on the incomplete
+    beta tail), where the small samples and extreme levels of Bonferroni bounds
+    need it. Above, the Cornish-Fisher expansion from the normal quantile is
+    within 1e-4 of the exact value. No scipy dependency either way.
+    """
+    if probability == 0.5:
+        return 0.0
+    if probability < 0.5:
+        return -t_quantile(1 - probability, degrees_of_freedom)
+    if degrees_of_freedom == 1:
+        return math.tan(math.pi * (probability - 0.5))
+    if degrees_of_freedom == 2:
+        return (2 * probability - 1) * math.sqrt(2 / (4 * probability * (1 - probability)))
+    if degrees_of_freedom < EXACT_T_DEGREES:
+        tail = 1 - probability
+        low, high = 0.0, 1.0
+        while t_upper_tail(high, degrees_of_freedom) > tail:
+            low, high = high, 2 * high
+        while high - low > 1e-12 * high:
+            middle = (low + high) / 2
+            if t_upper_tail(middle, degrees_of_freedom) > tail:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+    z = NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    return (z
+            + (z ** 3 + z) / (4 * v)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3)
+            + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * v ** 4))
+
+
+def confidence_interval(values, confidence=0.95):
+    """(mean, half-width) of a t confidence interval; half-width is inf below two values"""
+    values = [value for value in values if value is not None and not math.isnan(value)]
+    count = len(values)
+    if count == 0:
+        return math.nan, math.inf
+    mean = sum(values) / count
+    if count < 2:
+        return mean, math.inf
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    half_width = t_quantile(0.5 + confidence / 2, count - 1) * math.sqrt(variance / count)
+    return mean, half_width
+
+
+def paired_difference(values, baseline_values, confidence=0.95, pair_size=1):
+    """Paired-difference CI of values - baseline_values, matched by replication
+
+    Both arguments map replication -> metric value. With pair_size 2 (antithetic
+    pairs) each pair is averaged first, as its two members are not independent.
+    Returns (mean, half-width, independent half-width, pairs); the independent
+    half-width is what the same samples would give if compared unpaired.
+    """
+    units = {}
+    for replication in values.keys() & baseline_values.keys():
+        units.setdefault(replication // pair_size, []).append(replication)
+    complete = [sorted(replications) for _, replications in sorted(units.items()) if len(replications) == pair_size]
+
+    def unit_means(source):
+        return [sum(source[replication] for replication in replications) / pair_size for replications in complete]
+
+    scenario, baseline = unit_means(values), unit_means(baseline_values)
+    mean, half_width = confidence_interval([a - b for a, b in zip(scenario, baseline)], confidence)
+    independent = math.hypot(confidence_interval(scenario, confidence)[1], confidence_interval(baseline, confidence)[1])
+    return mean, half_width, independent, len(complete)
@@ -0,0 +1,23 @@
+from hospital_simulation.enhanced_simulation import EnhancedEmergencyDepartmentSimulation
+from hospital_simulation.event_kernel import HeapEmergencyDepartmentSimulation
+from hospital_simulation.network import NetworkSimulation
+
+# Simulation engines selectable with config['engine']
+ENGINES = {
+    'simpy': EnhancedEmergencyDepartmentSimulation,
+    'heap': HeapEmergencyDepartmentSimulation,
+}
+
+
+def create_simulation(config):
+    """Build the simulation for config['engine'] (SimPy unless set otherwise)
+
+    A config with a 'network' section runs the multi-department network mode,
+    which has its own event calendar.
+    """
+    if config.get('network'):
+        return NetworkSimulation(config)
+    engine = config.get('engine', 'simpy')
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {sorted(ENGINES)}")
+    return ENGINES[engine](config)
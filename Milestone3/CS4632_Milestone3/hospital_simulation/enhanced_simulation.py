@@ -1,58 +1,129 @@
 import simpy
-import random
 import json
-import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
 from pathlib import Path
 
+from hospital_simulation.arrivals import expected_arrivals
+from hospital_simulation.event_trace import EVENT_CODES, EventTrace
+from hospital_simulation.instrumentation import Instrumentation
+from hospital_simulation.online_stats import DEFAULT_QUANTILES, OnlinePatientMetrics
+from hospital_simulation.patient import CompactPatient, Patient
+from hospital_simulation.patient_store import PATIENT_COLUMNS, PatientStore
+from hospital_simulation.random_streams import create_random_streams
+from hospital_simulation.result_store import ResultStore
+from hospital_simulation.seeding import derive_run_seed
+from hospital_simulation.steady_state import batch_means, mser5_truncation
+from hospital_simulation.telemetry import TelemetryReporter
+from hospital_simulation.time_weighted import MonitoredResource
+from hospital_simulation.waiting_queue import QUEUE_HISTORY_COLUMNS, WaitingQueue
+
+
+def run_directory_name(config, run_id):
+    """Name of a run's output folder (one per replication when replicating)"""
+    if config.get('num_replications', 1) > 1:
+        return f"run_{run_id:03d}_rep{config.get('replication', 0):03d}"
+    return f"run_{run_id:03d}"
+
+
 class EnhancedEmergencyDepartmentSimulation:
     def __init__(self, config):
         self.config = config
-        self.env = simpy.Environment()
+        self.env = self.create_environment()
 
         # Set default values for missing config options
         self.config.setdefault('data_collection_interval', 5)
         self.config.setdefault('random_seed', 42)
-
-        # Resources
-        self.triage_nurses = simpy.Resource(self.env, capacity=config['num_triage_nurses'])
-        self.doctors = simpy.Resource(self.env, capacity=config['num_doctors'])
+        self.config.setdefault('replication', 0)
+        self.config.setdefault('record_events', False)
+        self.config.setdefault('event_buffer_size', 65536)
+        self.config.setdefault('compact_patients', True)
+        self.config.setdefault('metrics_mode', 'stored')  # 'stored' rows or 'online' statistics
+        self.config.setdefault('utilization_mode', 'exact')  # 'exact' time integrals or 'sampled' polling
+        self.config.setdefault('record_utilization_series', True)
+        self.config.setdefault('record_queue_history', True)
+        self.config.setdefault('random_streams', 'numpy')  # 'numpy' block streams or 'python' random.Random
+        self.config.setdefault('steady_state', None)  # Warm-up truncation and batch means when set
+        self.config.setdefault('verbosity', 1)  # 0 silent, 1 one line per run, 2 per-patient queue messages
+        self.config.setdefault('common_random_numbers', False)  # Same patients, same draws, in every scenario
+        self.config.setdefault('antithetic', False)  # Replications 2k and 2k + 1 form antithetic pairs
+        if self.config['steady_state'] and self.config['metrics_mode'] == 'online':
+            raise ValueError("steady_state analysis needs per-patient rows (metrics_mode 'stored')")
+
+        # Resources; in exact mode they track busy servers and queue lengths themselves
+        self.triage_nurses, self.doctors = self.create_resources()
 
         # Tracking systems
         self.waiting_queue = None
+        self.event_trace = None  # Created in run() when record_events is on
+        self.instrumentation = Instrumentation(self.config.get('instrumentation'))
+        self.telemetry = TelemetryReporter(self.config.get('telemetry'), self.config.get('run_id', 0),
+                                           self.config['replication'], self.config['simulation_time'],
+                                           self.config.get('purpose', ''))
         self.patient_id_counter = 0
+
         self.run_data = {
-            'patients': [],
+            'patients': self.create_patient_records(),
             'resource_utilization': [],
             'system_metrics': {},
             'queue_metrics': {}
         }
 
-        # Set random seed for reproducibility
-        random.seed(config.get('random_seed', 42))
-        np.random.seed(config.get('random_seed', 42))
+        # Each run owns its random streams, seeded from (base seed, run_id, replication),
+        # so several runs can share a process without disturbing each other
+        self.seed = derive_run_seed(self.config)
+        self.streams = create_random_streams(self.seed, self.config)
+
+        # With common random numbers each patient's service times are drawn on arrival,
+        # so patient k gets the same draws whatever order the scenario serves patients in;
+        # a trace's recorded service times likewise belong to their patient
+        self.draw_on_arrival = self.config['common_random_numbers'] or bool(self.config.get('trace'))
+
+        # Patient objects only live while in the ED; the slotted variant keeps them small
+        self.patient_class = CompactPatient if config['compact_patients'] else Patient
 
         # Create output directory
         self.output_dir = Path(config.get('output_directory', 'simulation_runs'))
         self.output_dir.mkdir(exist_ok=True)
 
+    def create_environment(self):
+        """Simulation clock and event loop (overridden by other engines)"""
+        return simpy.Environment()
+
+    def create_resources(self):
+        """Triage nurse and doctor pools (overridden by other engines)"""
+        if self.config['utilization_mode'] == 'exact':
+            series_interval = self.config['data_collection_interval'] if self.config['record_utilization_series'] else None
+            return (MonitoredResource(self.env, self.config['num_triage_nurses'], series_interval),
+                    MonitoredResource(self.env, self.config['num_doctors'], series_interval))
+        return (simpy.Resource(self.env, capacity=self.config['num_triage_nurses']),
+                simpy.Resource(self.env, capacity=self.config['num_doctors']))
+
+    def create_patient_records(self):
+        """Columnar store of completed patients, or running statistics in online mode"""
+        if self.config['metrics_mode'] == 'online':
+            return OnlinePatientMetrics(self.config.get('online_quantiles', DEFAULT_QUANTILES))
+        # Sized for the expected arrivals so the store rarely has to grow
+        expected_patients = expected_arrivals(self.config)
+        return PatientStore(capacity=int(expected_patients * 1.2) + 64)
+
     def patient_arrival_process(self):
         """Generate patient arrivals using Poisson process"""
         while True:
-            inter_arrival_time = random.expovariate(self.config['arrival_rate'])
+            inter_arrival_time = self.streams.interarrival()
             yield self.env.timeout(inter_arrival_time)
 
-            # Import Patient here to avoid circular imports
-            from hospital_simulation.patient import Patient
-            patient = Patient(self.patient_id_counter, self.env.now)
-            patient.assign_triage_level()
+            patient = self.patient_class(self.patient_id_counter, self.env.now)
+            patient.set_triage_level(self.streams.triage_level())
+            if self.draw_on_arrival:
+                patient.triage_time = self.streams.triage_time()
+                patient.treatment_time = self.streams.treatment_time()
             self.patient_id_counter += 1
 
             # Record arrival
             self.record_event('ARRIVAL', patient)
-            self.env.process(self.patient_flow(patient))
+            self.env.process(self.instrumentation.wrap_process('patient_flow', self.patient_flow(patient)))
 
     def patient_flow(self, patient):
         """Complete patient flow through the ED"""
@@ -63,7 +134,7 @@ class EnhancedEmergencyDepartmentSimulation:
             patient.triage_start_time = self.env.now
             self.record_event('TRIAGE_START', patient)
 
-            triage_time = random.expovariate(self.config['triage_rate'])
+            triage_time = patient.triage_time if self.draw_on_arrival else self.streams.triage_time()
             yield self.env.timeout(triage_time)
 
             patient.triage_end_time = self.env.now
@@ -71,8 +142,8 @@ class EnhancedEmergencyDepartmentSimulation:
 
         # Wait for doctor in priority queue
         if self.waiting_queue is None:
-            from hospital_simulation.waiting_queue import WaitingQueue
-            self.waiting_queue = WaitingQueue()
+            self.waiting_queue = WaitingQueue(verbose=self.config['verbosity'] >= 2,
+                                              record_history=self.config['record_queue_history'])
 
         self.waiting_queue.add_patient(patient, self.env.now)
         self.record_event('QUEUED_FOR_TREATMENT', patient)
@@ -81,13 +152,13 @@ class EnhancedEmergencyDepartmentSimulation:
         with self.doctors.request() as request:
             yield request
 
-            # Get the next patient from the queue (should be this patient due to priority)
-            next_patient = self.waiting_queue.get_next_patient(self.env.now)
+            # The doctor pool is FIFO, so take out the patient it granted, whatever their level
+            self.waiting_queue.remove(patient, self.env.now)
 
             patient.treatment_start_time = self.env.now
             self.record_event('TREATMENT_START', patient)
 
-            treatment_time = random.expovariate(self.config['treatment_rate'])
+            treatment_time = patient.treatment_time if self.draw_on_arrival else self.streams.treatment_time()
             yield self.env.timeout(treatment_time)
 
             patient.treatment_end_time = self.env.now
@@ -99,109 +170,197 @@ class EnhancedEmergencyDepartmentSimulation:
     def resource_monitor(self):
         """Monitor resource utilization at regular intervals"""
         while True:
-            # Record current resource states
-            utilization_data = {
-                'time': self.env.now,
-                'triage_nurses_busy': self.triage_nurses.count,
-                'triage_nurses_available': self.triage_nurses.capacity - self.triage_nurses.count,
-                'doctors_busy': self.doctors.count,
-                'doctors_available': self.doctors.capacity - self.doctors.count,
-                'triage_utilization': self.triage_nurses.count / self.triage_nurses.capacity,
-                'doctor_utilization': self.doctors.count / self.doctors.capacity
-            }
-            self.run_data['resource_utilization'].append(utilization_data)
-
+            self.record_utilization_sample()
             yield self.env.timeout(self.config.get('data_collection_interval', 5))
 
+    def record_utilization_sample(self):
+        """Record current resource states"""
+        utilization_data = {
+            'time': self.env.now,
+            'triage_nurses_busy': self.triage_nurses.count,
+            'triage_nurses_available': self.triage_nurses.capacity - self.triage_nurses.count,
+            'doctors_busy': self.doctors.count,
+            'doctors_available': self.doctors.capacity - self.doctors.count,
+            'triage_utilization': self.triage_nurses.count / self.triage_nurses.capacity,
+            'doctor_utilization': self.doctors.count / self.doctors.capacity
+        }
+        self.run_data['resource_utilization'].append(utilization_data)
+
+    def collect_time_weighted_stats(self):
+        """Close the exact utilization integrals at the end of the run
+
+        The per-interval averages become the resource_utilization rows, in the
+        same columns the sampling monitor writes.
+        """
+        now = self.env.now
+        for resource in (self.triage_nurses, self.doctors):
+            resource.busy.finalize(now)
+            resource.queue_length.finalize(now)
+        if self.waiting_queue is not None:
+            self.waiting_queue.finalize_stats(now)
+
+        if self.triage_nurses.busy.series is None:
+            return
+        triage_capacity = self.triage_nurses.capacity
+        doctor_capacity = self.doctors.capacity
+        for (time, triage_busy), (_, doctors_busy) in zip(self.triage_nurses.busy.series, self.doctors.busy.series):
+            self.run_data['resource_utilization'].append({
+                'time': time,
+                'triage_nurses_busy': triage_busy,
+                'triage_nurses_available': triage_capacity - triage_busy,
+                'doctors_busy': doctors_busy,
+                'doctors_available': doctor_capacity - doctors_busy,
+                'triage_utilization': triage_busy / triage_capacity,
+                'doctor_utilization': doctors_busy / doctor_capacity
+            })
+
     def record_event(self, event_type, patient):
-        """Record significant events"""
-        # This method records events - you can expand it to store events if needed
-        pass
+        """Record significant events to the event trace when it is enabled"""
+        if self.event_trace is not None:
+            self.event_trace.record(EVENT_CODES[event_type], patient.patient_id,
+                                    self.env.now, patient.triage_level or 0)
 
     def record_patient_completion(self, patient):
         """Record complete patient data when they exit system"""
-        wait_times = patient.calculate_wait_times()
-
-        patient_data = {
-            'patient_id': patient.patient_id,
-            'triage_level': patient.triage_level,
-            'arrival_time': patient.arrival_time,
-            'triage_start_time': patient.triage_start_time,
-            'triage_end_time': patient.triage_end_time,
-            'treatment_start_time': patient.treatment_start_time,
-            'treatment_end_time': patient.treatment_end_time,
-            'wait_for_triage': wait_times['wait_for_triage'],
-            'triage_duration': wait_times['triage_duration'],
-            'wait_for_treatment': wait_times['wait_for_treatment'],
-            'treatment_duration': wait_times['treatment_duration'],
-            'total_time_in_system': wait_times['total_time']
-        }
-
-        self.run_data['patients'].append(patient_data)
+        self.run_data['patients'].append(patient)
 
     def calculate_system_metrics(self):
         """Calculate overall system performance metrics"""
         if not self.run_data['patients']:
             return {}
 
-        df_patients = pd.DataFrame(self.run_data['patients'])
+        patients = self.run_data['patients']
 
-        metrics = {
-            'total_patients_processed': len(df_patients),
-            'simulation_duration': self.env.now,
-            'throughput': len(df_patients) / self.env.now,
+        # In steady-state mode the warm-up period is left out of every statistic
+        steady_state = self.steady_state_analysis() if self.config['steady_state'] else None
+        if steady_state is not None:
+            start_row = steady_state['warmup_patients']
+            metrics = patients.patient_metrics(self.env.now - steady_state['warmup_time'], start_row)
+        else:
+            metrics = patients.patient_metrics(self.env.now)
 
-            # Patient time metrics
-            'avg_total_time': df_patients['total_time_in_system'].mean(),
-            'avg_wait_for_triage': df_patients['wait_for_triage'].mean(),
-            'avg_wait_for_treatment': df_patients['wait_for_treatment'].mean(),
-
-            # Service time metrics
-            'avg_triage_time': df_patients['triage_duration'].mean(),
-            'avg_treatment_time': df_patients['treatment_duration'].mean(),
-        }
-
-        # Add resource utilization if we have that data
-        if self.run_data['resource_utilization']:
-            df_resources = pd.DataFrame(self.run_data['resource_utilization'])
+        # Add resource utilization: exact time averages, or the mean of the samples
+        if self.config['utilization_mode'] == 'exact':
+            now = self.env.now
             metrics.update({
-                'avg_triage_utilization': df_resources['triage_utilization'].mean(),
-                'avg_doctor_utilization': df_resources['doctor_utilization'].mean(),
-                'max_triage_utilization': df_resources['triage_utilization'].max(),
-                'max_doctor_utilization': df_resources['doctor_utilization'].max(),
+                'avg_triage_utilization': self.triage_nurses.busy.mean(now) / self.triage_nurses.capacity,
+                'avg_doctor_utilization': self.doctors.busy.mean(now) / self.doctors.capacity,
+                'max_triage_utilization': self.triage_nurses.busy.max / self.triage_nurses.capacity,
+                'max_doctor_utilization': self.doctors.busy.max / self.doctors.capacity,
+                'avg_triage_queue_length': self.triage_nurses.queue_length.mean(now),
+                'avg_treatment_queue_length': self.doctors.queue_length.mean(now),
+                'max_triage_queue_length': self.triage_nurses.queue_length.max,
+                'max_treatment_queue_length': self.doctors.queue_length.max,
+            })
+        elif self.run_data['resource_utilization']:
+            samples = self.run_data['resource_utilization']
+            triage_samples = np.array([row['triage_utilization'] for row in samples])
+            doctor_samples = np.array([row['doctor_utilization'] for row in samples])
+            metrics.update({
+                'avg_triage_utilization': triage_samples.mean(),
+                'avg_doctor_utilization': doctor_samples.mean(),
+                'max_triage_utilization': triage_samples.max(),
+                'max_doctor_utilization': doctor_samples.max(),
             })
 
         # By triage level
-        metrics['metrics_by_triage_level'] = {}
-        for level in range(1, 6):
-            level_data = df_patients[df_patients['triage_level'] == level]
-            if len(level_data) > 0:
-                metrics['metrics_by_triage_level'][level] = {
-                    'count': len(level_data),
-                    'avg_total_time': level_data['total_time_in_system'].mean(),
-                    'avg_wait_for_treatment': level_data['wait_for_treatment'].mean(),
-                    'max_wait_for_treatment': level_data['wait_for_treatment'].max()
-                }
+        if steady_state is not None:
+            metrics['metrics_by_triage_level'] = patients.metrics_by_triage_level(steady_state['warmup_patients'])
+        else:
+            metrics['metrics_by_triage_level'] = patients.metrics_by_triage_level()
+        if self.waiting_queue is not None:
+            for level, level_metrics in metrics['metrics_by_triage_level'].items():
+                level_metrics['avg_queue_length'] = self.waiting_queue.length_stats[level].mean(self.env.now)
+
+        if steady_state is not None:
+            # Utilization after the warm-up, from the interval series (whole-run values otherwise)
+            post_warmup = [row for row in self.run_data['resource_utilization'] if row['time'] >= steady_state['warmup_time']]
+            if post_warmup:
+                metrics['avg_triage_utilization'] = sum(row['triage_utilization'] for row in post_warmup) / len(post_warmup)
+                metrics['avg_doctor_utilization'] = sum(row['doctor_utilization'] for row in post_warmup) / len(post_warmup)
+            metrics['steady_state'] = steady_state
 
         return metrics
 
+    def steady_state_analysis(self):
+        """Warm-up truncation point and batch-means confidence intervals for one long run
+
+        The warm-up is detected with MSER-5 on the time in system of patients in
+        completion order (or set as a fixed number of minutes with 'warmup').
+        CIs come from batch means over the remaining patients, so a single long
+        run gives interval estimates without independent replications.
+        """
+        options = self.config['steady_state']
+        options = options if isinstance(options, dict) else {}
+        patients = self.run_data['patients']
+        total_time = patients.column('total_time_in_system')
+        completion_time = patients.column('treatment_end_time')
+
+        warmup = options.get('warmup', 'mser5')
+        if warmup == 'mser5':
+            start_row = mser5_truncation(total_time, options.get('max_warmup_fraction', 0.5))
+        else:
+            start_row = int(np.searchsorted(completion_time, warmup, side='left'))
+        warmup_time = float(completion_time[start_row - 1]) if start_row else 0.0
+
+        num_batches = options.get('num_batches', 20)
+        confidence = options.get('confidence', 0.95)
+        return {
+            'warmup_patients': start_row,
+            'warmup_time': warmup_time,
+            'total_time': batch_means(total_time[start_row:], num_batches, confidence),
+            'wait_for_treatment': batch_means(patients.column('wait_for_treatment')[start_row:], num_batches, confidence),
+            'wait_for_triage': batch_means(patients.column('wait_for_triage')[start_row:], num_batches, confidence),
+        }
+
+    def run_directory_name(self, run_id):
+        """Name of the output folder for this run (one per replication when replicating)"""
+        return run_directory_name(self.config, run_id)
+
+    def result_tables(self):
+        """This run's patient, utilization and queue tables as column arrays"""
+        tables = {}
+        patients = self.run_data['patients']
+        if patients and self.config['metrics_mode'] != 'online':
+            tables['patients'] = {name: patients.column(name) for name in PATIENT_COLUMNS}
+        utilization = self.run_data['resource_utilization']
+        if utilization:
+            tables['resource_utilization'] = {name: [row[name] for row in utilization] for name in utilization[0]}
+        if self.waiting_queue is not None and self.waiting_queue.queue_history:
+            history = np.array(self.waiting_queue.queue_history)
+            tables['queue_history'] = {name: history[:, index] if index == 0 else history[:, index].astype(np.int32)
+                                       for index, name in enumerate(QUEUE_HISTORY_COLUMNS)}
+        return tables
+
     def export_data(self, run_id):
         """Export all collected data to files"""
-        run_dir = self.output_dir / f"run_{run_id:03d}"
+        run_dir = self.output_dir / self.run_directory_name(run_id)
         run_dir.mkdir(exist_ok=True)
 
-        # Export patient data
-        if self.run_data['patients']:
-            df_patients = pd.DataFrame(self.run_data['patients'])
+        # Finish the event trace (written to events.bin while the run progressed)
+        if self.event_trace is not None:
+            self.event_trace.close()
+
+        # Append this run's tables to the consolidated result store; CSVs become optional
+        store = ResultStore.from_config(self.config)
+        if store is not None:
+            for table, columns in self.result_tables().items():
+                store.write(table, columns, run_id, self.config['replication'])
+        write_csv = store is None or self.config['result_store'].get('csv', True)
+
+        # Export patient data (online mode keeps no per-patient rows)
+        if write_csv and self.run_data['patients'] and self.config['metrics_mode'] != 'online':
+            df_patients = self.run_data['patients'].to_dataframe()
             df_patients.to_csv(run_dir / "patients.csv", index=False)
 
         # Export resource utilization data
-        if self.run_data['resource_utilization']:
+        if write_csv and self.run_data['resource_utilization']:
+            import pandas as pd
             df_resources = pd.DataFrame(self.run_data['resource_utilization'])
             df_resources.to_csv(run_dir / "resource_utilization.csv", index=False)
 
         # Export queue data if we have it
-        if self.waiting_queue:
+        if write_csv and self.waiting_queue is not None:
             try:
                 self.waiting_queue.export_queue_data(run_dir / "queue_history.csv")
             except:
@@ -216,6 +375,8 @@ class EnhancedEmergencyDepartmentSimulation:
             'config': self.config,
             'system_metrics': system_metrics,
         }
+        if self.event_trace is not None:
+            metrics_data['events_recorded'] = len(self.event_trace)
 
         with open(run_dir / "metrics.json", 'w') as f:
             json.dump(metrics_data, f, indent=2)
@@ -223,10 +384,20 @@ class EnhancedEmergencyDepartmentSimulation:
         # Also export flat metrics for CSV
         metrics_flat = {
             'run_id': run_id,
+            'replication': self.config['replication'],
             'total_patients': system_metrics.get('total_patients_processed', 0),
             'avg_total_time': system_metrics.get('avg_total_time', 0),
+            'avg_wait_for_treatment': system_metrics.get('avg_wait_for_treatment', 0),
             'throughput': system_metrics.get('throughput', 0)
         }
+        for level, level_metrics in system_metrics.get('metrics_by_triage_level', {}).items():
+            metrics_flat[f"level_{level}_avg_wait_for_treatment"] = level_metrics['avg_wait_for_treatment']
+            metrics_flat[f"level_{level}_max_wait_for_treatment"] = level_metrics['max_wait_for_treatment']
+        if 'steady_state' in system_metrics:
+            steady_state = system_metrics['steady_state']
+            metrics_flat['warmup_time'] = steady_state['warmup_time']
+            metrics_flat['avg_total_time_half_width'] = steady_state['total_time']['half_width']
+            metrics_flat['avg_wait_for_treatment_half_width'] = steady_state['wait_for_treatment']['half_width']
 
         # Add utilization if available
         if 'avg_doctor_utilization' in system_metrics:
@@ -234,24 +405,61 @@ class EnhancedEmergencyDepartmentSimulation:
 
         return metrics_flat
 
+    def simulate(self, until):
+        """Start the SimPy processes and advance the clock to `until`"""
+        wrap_process = self.instrumentation.wrap_process
+        self.instrumentation.attach(self.env)
+        self.telemetry.attach(self.env, self.run_data['patients'])
+        self.env.process(wrap_process('patient_arrival', self.patient_arrival_process()))
+        if self.config['utilization_mode'] == 'sampled':
+            self.env.process(wrap_process('resource_monitor', self.resource_monitor()))
+        self.env.run(until=until)
+
     def run(self, run_id):
         """Run the simulation"""
-        print(f"Starting simulation run {run_id}")
-        print(f"Configuration: {self.config}")
-
-        # Start processes
-        self.env.process(self.patient_arrival_process())
-        self.env.process(self.resource_monitor())
+        verbosity = self.config['verbosity']
+        if verbosity >= 1:
+            print(f"Starting simulation run {run_id}")
+        if verbosity >= 2:
+            print(f"Configuration: {self.config}")
+
+        # Stream events to disk as the run progresses
+        if self.config['record_events']:
+            run_dir = self.output_dir / self.run_directory_name(run_id)
+            run_dir.mkdir(exist_ok=True)
+            self.event_trace = EventTrace(run_dir / "events.bin", self.config['event_buffer_size'])
 
         # Run simulation
+        instrumentation = self.instrumentation
+        instrumentation.start()
+        self.telemetry.start()
         start_time = datetime.now()
-        self.env.run(until=self.config['simulation_time'])
-        end_time = datetime.now()
-
-        # Export data
-        metrics = self.export_data(run_id)
+        try:
+            with instrumentation.phase('simulate'):
+                self.simulate(self.config['simulation_time'])
+            end_time = datetime.now()
+            self.telemetry.finish(self.env.now, len(self.run_data['patients']))
+
+            if self.config['utilization_mode'] == 'exact':
+                self.collect_time_weighted_stats()
+
+            # Export data
+            with instrumentation.phase('export'):
+                metrics = self.export_data(run_id)
+        finally:
+            # Export closes the trace; a run that raised still leaves every recorded event on disk
+            if self.event_trace is not None:
+                self.event_trace.close()
         metrics['real_world_duration'] = (end_time - start_time).total_seconds()
 
-        print(f"Completed run {run_id}: Processed {metrics['total_patients']} patients")
+        instrumentation.stop()
+        if instrumentation.enabled:
+            instrumentation.write(self.output_dir / self.run_directory_name(run_id))
+            report = instrumentation.report()
+            metrics['events_processed'] = report.get('events_processed')
+            metrics.update({f"{name}_seconds": seconds for name, seconds in report['seconds'].items()})
+
+        if verbosity >= 1:
+            print(f"Completed run {run_id}: Processed {metrics['total_patients']} patients")
 
         return metrics
\ No newline at end of file
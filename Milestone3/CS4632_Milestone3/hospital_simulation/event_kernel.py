@@ -0,0 +1,163 @@
+import heapq
+from collections import deque
+from itertools import count
+
+from hospital_simulation.enhanced_simulation import EnhancedEmergencyDepartmentSimulation
+from hospital_simulation.time_weighted import TimeWeightedStat
+from hospital_simulation.waiting_queue import WaitingQueue
+
+# Calendar event kinds
+ARRIVAL, TRIAGE_END, TREATMENT_END, MONITOR = 0, 1, 2, 3
+
+
+class EventCalendar:
+    """Clock of the heap engine; stands in for simpy.Environment where only `now` is read"""
+    __slots__ = ('now',)
+
+    def __init__(self):
+        self.now = 0
+
+
+class ServerPool:
+    """Integer server counter with a FIFO wait queue, standing in for simpy.Resource"""
+    __slots__ = ('capacity', 'count', 'queue', 'busy', 'queue_length')
+
+    def __init__(self, capacity, series_interval=None):
+        self.capacity = capacity
+        self.count = 0
+        self.queue = deque()
+        self.busy = TimeWeightedStat(0, 0, series_interval)
+        self.queue_length = TimeWeightedStat(0, 0, series_interval)
+
+    def request(self, patient, time):
+        """Seize a free server (True) or join the queue (False)"""
+        if self.count < self.capacity:
+            self.count += 1
+            self.busy.update(time, self.count)
+            return True
+        self.queue.append(patient)
+        self.queue_length.update(time, len(self.queue))
+        return False
+
+    def release(self, time):
+        """Free a server; it passes straight to the next queued patient, who is returned"""
+        if self.queue:
+            patient = self.queue.popleft()
+            self.queue_length.update(time, len(self.queue))
+            return patient
+        self.count -= 1
+        self.busy.update(time, self.count)
+        return None
+
+
+class HeapEmergencyDepartmentSimulation(EnhancedEmergencyDepartmentSimulation):
+    """The same two-stage ED model run on a heap event calendar instead of SimPy
+
+    The flow is fixed (triage, then treatment), so each patient needs only three
+    scheduled events (arrival, triage end, treatment end) and resources reduce to
+    integer counters with FIFO queues, as simpy.Resource grants them. Every
+    stream is consumed in the same order as in the SimPy engine, so both give the
+    same metrics and exports for the same seed; only the engine cost differs.
+    """
+
+    def create_environment(self):
+        return EventCalendar()
+
+    def create_resources(self):
+        series_interval = None
+        if self.config['utilization_mode'] == 'exact' and self.config['record_utilization_series']:
+            series_interval = self.config['data_collection_interval']
+        return (ServerPool(self.config['num_triage_nurses'], series_interval),
+                ServerPool(self.config['num_doctors'], series_interval))
+
+    def simulate(self, until):
+        """Process calendar events in time order until the clock reaches `until`"""
+        env = self.env
+        calendar = []
+        sequence = count()  # Breaks time ties in scheduling order, like SimPy
+        push = heapq.heappush
+        pop = heapq.heappop
+        interarrival = self.streams.interarrival
+        triage_level = self.streams.triage_level
+        triage_time = self.streams.triage_time
+        treatment_time = self.streams.treatment_time
+        record_event = self.record_event
+        nurses = self.triage_nurses
+        doctors = self.doctors
+        monitor_interval = self.config['data_collection_interval']
+        if self.waiting_queue is None:
+            self.waiting_queue = WaitingQueue(verbose=self.config['verbosity'] >= 2,
+                                              record_history=self.config['record_queue_history'])
+        waiting_queue = self.waiting_queue
+        patients = self.run_data['patients']
+        telemetry = self.telemetry if self.telemetry.enabled else None
+        events = 0  # Events processed
+
+        draw_on_arrival = self.draw_on_arrival
+
+        def start_triage(patient, time):
+            patient.triage_start_time = time
+            record_event('TRIAGE_START', patient)
+            duration = patient.triage_time if draw_on_arrival else triage_time()
+            push(calendar, (time + duration, next(sequence), TRIAGE_END, patient))
+
+        def start_treatment(patient, time):
+            waiting_queue.remove(patient, time)
+            patient.treatment_start_time = time
+            record_event('TREATMENT_START', patient)
+            duration = patient.treatment_time if draw_on_arrival else treatment_time()
+            push(calendar, (time + duration, next(sequence), TREATMENT_END, patient))
+
+        push(calendar, (interarrival(), next(sequence), ARRIVAL, None))
+        if self.config['utilization_mode'] == 'sampled':
+            push(calendar, (0, next(sequence), MONITOR, None))
+
+        while calendar and calendar[0][0] < until:
+            time, _, kind, patient = pop(calendar)
+            env.now = time
+            events += 1
+
+            if kind == ARRIVAL:
+                if telemetry is not None and telemetry.due():
+                    telemetry.events = events
+                    telemetry.send('running', time, len(patients))
+                patient = self.patient_class(self.patient_id_counter, time)
+                patient.set_triage_level(triage_level())
+                if draw_on_arrival:
+                    patient.triage_time = triage_time()
+                    patient.treatment_time = treatment_time()
+                self.patient_id_counter += 1
+                record_event('ARRIVAL', patient)
+                push(calendar, (time + interarrival(), next(sequence), ARRIVAL, None))
+
+                patient.triage_start_time = time
+                if nurses.request(patient, time):
+                    start_triage(patient, time)
+
+            elif kind == TRIAGE_END:
+                patient.triage_end_time = time
+                record_event('TRIAGE_END', patient)
+                next_patient = nurses.release(time)
+
+                waiting_queue.add_patient(patient, time)
+                record_event('QUEUED_FOR_TREATMENT', patient)
+                if doctors.request(patient, time):
+                    start_treatment(patient, time)
+                if next_patient is not None:
+                    start_triage(next_patient, time)
+
+            elif kind == TREATMENT_END:
+                patient.treatment_end_time = time
+                record_event('TREATMENT_END', patient)
+                next_patient = doctors.release(time)
+                self.record_patient_completion(patient)
+                if next_patient is not None:
+                    start_treatment(next_patient, time)
+
+            else:
+                self.record_utilization_sample()
+                push(calendar, (time + monitor_interval, next(sequence), MONITOR, None))
+
+        env.now = until
+        self.instrumentation.events_processed += events
+        self.telemetry.events = events
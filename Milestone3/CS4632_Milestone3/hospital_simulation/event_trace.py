@@ -0,0 +1,74 @@
+import numpy as np
+from array import array
+from pathlib import Path
+
+# Event type codes stored in the trace, in the order a patient passes through them
+EVENT_NAMES = ['ARRIVAL', 'TRIAGE_START', 'TRIAGE_END', 'QUEUED_FOR_TREATMENT',
+               'TREATMENT_START', 'TREATMENT_END']
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+
+# On-disk record layout of the trace file
+EVENT_DTYPE = np.dtype([('event', np.uint8), ('patient_id', np.int64),
+                        ('time', np.float64), ('level', np.uint8)])
+
+
+class EventTrace:
+    """Fixed-size columnar event buffer that is bulk-written to a binary file when full
+
+    Each column is a preallocated typed array, so recording an event is four
+    index assignments and memory stays at `buffer_size` events however long the
+    run is. The file is a flat sequence of EVENT_DTYPE records.
+    """
+
+    def __init__(self, path, buffer_size=65536):
+        self.path = Path(path)
+        self.buffer_size = buffer_size
+        self.codes = array('B', bytes(buffer_size))
+        self.patient_ids = array('q', bytes(8 * buffer_size))
+        self.times = array('d', bytes(8 * buffer_size))
+        self.levels = array('B', bytes(buffer_size))
+        self.size = 0
+        self.events_written = 0
+        self.file = open(self.path, 'wb')
+
+    def __len__(self):
+        return self.events_written + self.size
+
+    def record(self, code, patient_id, time, level):
+        """Append one event to the buffer, spilling to disk once it is full"""
+        index = self.size
+        self.codes[index] = code
+        self.patient_ids[index] = patient_id
+        self.times[index] = time
+        self.levels[index] = level
+        self.size = index + 1
+        if self.size == self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered events to the trace file and empty the buffer"""
+        count = self.size
+        if not count:
+            return
+        records = np.empty(count, dtype=EVENT_DTYPE)
+        records['event'] = np.frombuffer(self.codes, dtype=np.uint8, count=count)
+        records['patient_id'] = np.frombuffer(self.patient_ids, dtype=np.int64, count=count)
+        records['time'] = np.frombuffer(self.times, dtype=np.float64, count=count)
+        records['level'] = np.frombuffer(self.levels, dtype=np.uint8, count=count)
+        records.tofile(self.file)
+        self.events_written += count
+        self.size = 0
+
+    def close(self):
+        """Flush remaining events and close the trace file"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_event_trace(path):
+    """Memory-map a trace file as a structured array with EVENT_DTYPE fields"""
+    path = Path(path)
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    return np.memmap(path, dtype=EVENT_DTYPE, mode='r')
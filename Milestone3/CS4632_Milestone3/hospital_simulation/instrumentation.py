@@ -0,0 +1,139 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """Optional run instrumentation switched on by config['instrumentation']
+
+    Options (all off unless 'enabled' is true):
+        count_events   -- count SimPy events processed (default on when enabled)
+        time_processes -- time spent inside patient_flow / resource_monitor code
+        tracemalloc    -- peak traced memory and top allocation sites
+        cprofile       -- profile the run and write profile.prof / profile.txt
+
+    When disabled every hook returns immediately or hands back what it was given,
+    so the simulation pays one attribute check per patient at most.
+    """
+
+    def __init__(self, options=None):
+        options = options or {}
+        self.enabled = bool(options.get('enabled', False))
+        self.count_events = self.enabled and options.get('count_events', True)
+        self.time_processes = self.enabled and options.get('time_processes', True)
+        self.trace_allocations = self.enabled and options.get('tracemalloc', False)
+        self.use_cprofile = self.enabled and options.get('cprofile', False)
+        self.top_allocations = options.get('top_allocations', 10)
+
+        self.seconds = defaultdict(float)
+        self.events_processed = 0
+        self.allocations = None
+        self.profiler = None
+
+    def attach(self, env):
+        """Count events by wrapping the SimPy environment's step()"""
+        if not self.count_events or not hasattr(env, 'step'):
+            return
+        step = env.step
+
+        def counting_step():
+            self.events_processed += 1
+            step()
+
+        env.step = counting_step
+
+    def wrap_process(self, name, generator):
+        """Return the process generator, timed under `name` when process timing is on"""
+        if not self.time_processes:
+            return generator
+        return self._timed_process(name, generator)
+
+    def _timed_process(self, name, generator):
+        # Only the time spent running the process body counts; SimPy time between
+        # steps is what remains of the simulate phase. Like `yield from`, failed
+        # events and interrupts are thrown into the process and its return value
+        # is passed on, so timing does not change what the process does.
+        timer = time.perf_counter
+        resume, value = generator.send, None
+        while True:
+            start = timer()
+            try:
+                event = resume(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.seconds[name] += timer() - start
+            try:
+                value = yield event
+            except GeneratorExit:
+                generator.close()
+                raise
+            except BaseException as error:
+                resume, value = generator.throw, error
+            else:
+                resume = generator.send
+
+    @contextmanager
+    def phase(self, name):
+        """Time a run phase (simulate, export) when enabled"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def start(self):
+        if self.trace_allocations:
+            tracemalloc.start()
+        if self.use_cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.trace_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:self.top_allocations]
+            tracemalloc.stop()
+            self.allocations = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_sites': [{'site': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                              for stat in top],
+            }
+
+    def report(self):
+        """Collected measurements as a JSON-ready dict"""
+        seconds = dict(self.seconds)
+        process_seconds = [value for name, value in seconds.items() if name not in ('simulate', 'export')]
+        if 'simulate' in seconds and process_seconds:
+            seconds['engine_overhead'] = seconds['simulate'] - sum(process_seconds)
+        report = {'seconds': seconds}
+        if self.count_events:
+            report['events_processed'] = self.events_processed
+            if seconds.get('simulate'):
+                report['events_per_second'] = self.events_processed / seconds['simulate']
+        if self.allocations is not None:
+            report['allocations'] = self.allocations
+        return report
+
+    def write(self, run_dir):
+        """Write instrumentation.json (and the cProfile output) into the run folder"""
+        if not self.enabled:
+            return
+        with open(run_dir / "instrumentation.json", 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        if self.profiler is not None:
+            self.profiler.dump_stats(run_dir / "profile.prof")
+            summary = io.StringIO()
+            pstats.Stats(self.profiler, stream=summary).sort_stats('cumulative').print_stats(30)
+            (run_dir / "profile.txt").write_text(summary.getvalue())
@@ -0,0 +1,167 @@
+import itertools
+
+import numpy as np
+
+from hospital_simulation.arrivals import RateSchedule
+from hospital_simulation.patient import TRIAGE_LEVEL_WEIGHTS, TRIAGE_LEVELS
+
+
+def expand_grid(base_config, **parameter_values):
+    """One config per combination of the given parameter values, e.g. num_doctors=[2, 3, 4]"""
+    names = list(parameter_values)
+    return [{**base_config, **dict(zip(names, values))}
+            for values in itertools.product(*parameter_values.values())]
+
+
+def _fifo_multi_server(ready_times, service_times, servers, max_servers):
+    """Start times of a FIFO multi-server queue for every row at once
+
+    Customers are taken in column order; each goes to the server that frees up
+    first (Kiefer-Wolfowitz recursion). Servers beyond a row's capacity stay
+    free at +inf so they are never picked.
+    """
+    rows, customers = ready_times.shape
+    row_index = np.arange(rows)
+    free_at = np.zeros((rows, max_servers))
+    free_at[np.arange(max_servers) >= servers[:, None]] = np.inf
+    start_times = np.empty_like(ready_times)
+    for customer in range(customers):
+        server = free_at.argmin(axis=1)
+        start = np.maximum(ready_times[:, customer], free_at[row_index, server])
+        start_times[:, customer] = start
+        free_at[row_index, server] = start + service_times[:, customer]
+    return start_times
+
+
+def _busy_fraction(start_times, end_times, horizon, servers):
+    """Fraction of server time busy in [0, horizon] for each row"""
+    busy = np.minimum(end_times, horizon[:, None]) - np.minimum(start_times, horizon[:, None])
+    return np.nansum(np.clip(busy, 0, None), axis=1) / (servers * horizon)
+
+
+def _row_mean(values, mask):
+    counts = mask.sum(axis=1)
+    totals = np.where(mask, values, 0.0).sum(axis=1)
+    return np.divide(totals, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+
+
+def run_lockstep(configs, replications=1, seed=42):
+    """Simulate every (config, replication) pair together as NumPy arrays
+
+    Intended for coarse screening of large parameter grids: instead of an event
+    loop per run, the triage and treatment stages are solved as FIFO
+    multi-server recursions over all rows in lockstep, one customer index at a
+    time. It models the same flow as EnhancedEmergencyDepartmentSimulation
+    (doctors are granted FIFO, as simpy.Resource does), so the summary metrics
+    agree in distribution, not sample path. All rows draw from one generator,
+    so a row's sample depends on the grid it belongs to.
+
+    Returns one metrics dict per row, in config-major order, with the keys of
+    calculate_system_metrics plus 'config_index' and 'replication'.
+    """
+    if any(config.get('trace') for config in configs):
+        raise ValueError("trace-driven configs need an event engine ('simpy' or 'heap')")
+    rows = [(index, replication) for index in range(len(configs)) for replication in range(replications)]
+    row_configs = [configs[index] for index, _ in rows]
+
+    def column(name):
+        return np.array([config[name] for config in row_configs], dtype=np.float64)
+
+    horizon = column('simulation_time')
+    arrival_rate = column('arrival_rate')
+    triage_rate = column('triage_rate')
+    treatment_rate = column('treatment_rate')
+    nurses = column('num_triage_nurses').astype(int)
+    doctors = column('num_doctors').astype(int)
+    rng = np.random.default_rng(seed)
+
+    # Rows with an arrival_schedule draw unit-rate epochs up to the horizon's cumulative
+    # intensity and map them to times by inversion afterwards
+    schedules = [RateSchedule.from_config(config) for config in row_configs]
+    scheduled = np.array([schedule is not None for schedule in schedules])
+    epoch_rate = np.where(scheduled, 1.0, arrival_rate)
+    limit = np.array([horizon[row] if schedule is None else float(schedule.cumulative(horizon[row]))
+                      for row, schedule in enumerate(schedules)])
+
+    # Enough arrivals to pass every row's horizon (8 standard deviations of the Poisson count)
+    expected = epoch_rate * limit
+    customers = int(np.max(expected + 8 * np.sqrt(expected))) + 20
+    arrivals = np.cumsum(rng.standard_exponential((len(rows), customers)) / epoch_rate[:, None], axis=1)
+    while np.any(arrivals[:, -1] < limit):
+        extra = np.cumsum(rng.standard_exponential((len(rows), customers)) / epoch_rate[:, None], axis=1)
+        arrivals = np.hstack([arrivals, arrivals[:, -1:] + extra])
+    for row in np.flatnonzero(scheduled):
+        arrivals[row] = schedules[row].inverse(arrivals[row])
+    arrivals[arrivals >= horizon[:, None]] = np.inf
+
+    levels = np.asarray(TRIAGE_LEVELS)[
+        np.minimum(np.searchsorted(np.cumsum(TRIAGE_LEVEL_WEIGHTS), rng.random(arrivals.shape), side='right'),
+                   len(TRIAGE_LEVELS) - 1)]
+    triage_times = rng.standard_exponential(arrivals.shape) / triage_rate[:, None]
+    treatment_times = rng.standard_exponential(arrivals.shape) / treatment_rate[:, None]
+
+    # Triage stage in arrival order
+    triage_start = _fifo_multi_server(arrivals, triage_times, nurses, int(nurses.max()))
+    triage_end = triage_start + triage_times
+
+    # Treatment stage in order of triage completion
+    order = np.argsort(triage_end, axis=1, kind='stable')
+    ready = np.take_along_axis(triage_end, order, axis=1)
+    treatment_service = np.take_along_axis(treatment_times, order, axis=1)
+    treatment_start_sorted = _fifo_multi_server(ready, treatment_service, doctors, int(doctors.max()))
+    treatment_start = np.empty_like(treatment_start_sorted)
+    np.put_along_axis(treatment_start, order, treatment_start_sorted, axis=1)
+    treatment_end = treatment_start + treatment_times
+
+    with np.errstate(invalid='ignore'):
+        completed = treatment_end < horizon[:, None]
+        wait_for_triage = triage_start - arrivals
+        wait_for_treatment = treatment_start - triage_end
+        total_time = treatment_end - arrivals
+        triage_utilization = _busy_fraction(triage_start, triage_end, horizon, nurses)
+        doctor_utilization = _busy_fraction(treatment_start, treatment_end, horizon, doctors)
+
+    patients = completed.sum(axis=1)
+    summary = {
+        'avg_total_time': _row_mean(total_time, completed),
+        'avg_wait_for_triage': _row_mean(wait_for_triage, completed),
+        'avg_wait_for_treatment': _row_mean(wait_for_treatment, completed),
+        'avg_triage_time': _row_mean(triage_times, completed),
+        'avg_treatment_time': _row_mean(treatment_times, completed),
+    }
+    by_level = {}
+    for level in TRIAGE_LEVELS:
+        in_level = completed & (levels == level)
+        by_level[level] = (
+            in_level.sum(axis=1),
+            _row_mean(total_time, in_level),
+            _row_mean(wait_for_treatment, in_level),
+            np.where(in_level, wait_for_treatment, -np.inf).max(axis=1),
+        )
+
+    results = []
+    for row, (config_index, replication) in enumerate(rows):
+        if patients[row] == 0:
+            metrics = {}
+        else:
+            metrics = {
+                'total_patients_processed': int(patients[row]),
+                'simulation_duration': float(horizon[row]),
+                'throughput': patients[row] / horizon[row],
+                **{name: float(values[row]) for name, values in summary.items()},
+                'avg_triage_utilization': float(triage_utilization[row]),
+                'avg_doctor_utilization': float(doctor_utilization[row]),
+                'metrics_by_triage_level': {
+                    level: {
+                        'count': int(count[row]),
+                        'avg_total_time': float(avg_total[row]),
+                        'avg_wait_for_treatment': float(avg_wait[row]),
+                        'max_wait_for_treatment': float(max_wait[row]),
+                    }
+                    for level, (count, avg_total, avg_wait, max_wait) in by_level.items() if count[row] > 0
+                },
+            }
+        metrics['config_index'] = config_index
+        metrics['replication'] = replication
+        results.append(metrics)
+    return results
@@ -0,0 +1,387 @@
+"""Regional network of emergency departments on one event calendar
+
+Enabled by config['network']; every department runs the same two-stage model
+as the single-ED engines (triage, then treatment), with the base config's
+rates and staffing unless config['network']['departments'] overrides them per
+department. A share of each department's arrivals comes by ambulance: the call
+happens in the department's catchment, and the ambulance takes the patient to
+the nearest department that is not on diversion among the home department and
+its precomputed neighbours. A department goes on diversion when its treatment
+queue reaches diversion_threshold and comes off at diversion_release.
+
+All state is per department (server pools, patient store, random streams,
+neighbour list), so memory grows linearly with the number of departments.
+Routing reads each candidate's diversion flag, which is kept up to date as its
+queue changes, so no event scans the network; the calendar is one heap, so an
+event costs O(log pending events).
+"""
+import heapq
+import json
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+
+import numpy as np
+
+from hospital_simulation.arrivals import expected_arrivals, scaled_schedule
+from hospital_simulation.enhanced_simulation import run_directory_name
+from hospital_simulation.event_kernel import EventCalendar, ServerPool
+from hospital_simulation.patient import CompactPatient, Patient
+from hospital_simulation.patient_store import PatientStore
+from hospital_simulation.random_streams import RandomStreams, antithetic_side, interarrival_stream
+from hospital_simulation.result_store import ResultStore
+from hospital_simulation.seeding import derive_run_seed, derive_seed
+from hospital_simulation.telemetry import TelemetryReporter
+from hospital_simulation.time_weighted import TimeWeightedStat
+
+# Calendar event kinds
+WALK_IN, AMBULANCE_CALL, AMBULANCE_ARRIVAL, TRIAGE_END, TREATMENT_END = range(5)
+
+# Extra generator ids next to random_streams.STREAM_IDS
+AMBULANCE_STREAM = 4
+LAYOUT_STREAM = 5
+
+# Variates drawn per block; smaller than a single ED's, as hundreds of departments each hold five streams
+NETWORK_BLOCK_SIZE = 256
+
+NETWORK_DEFAULTS = {
+    'num_departments': 100,
+    'region_size': 100.0,        # Side of the square region the departments sit in, km
+    'ambulance_fraction': 0.25,  # Share of each department's arrivals that come by ambulance
+    'transport_time': 10.0,      # Minutes from pick-up to the home department
+    'travel_speed': 1.0,         # km per minute for a diverted ambulance's extra distance
+    'diversion_threshold': 10,   # Treatment queue length that puts a department on diversion
+    'diversion_release': 5,      # Treatment queue length at which it comes off diversion
+    'neighbours': 8,             # Nearest other departments an ambulance may be diverted to
+    'departments': None,         # Optional list of per-department config overrides
+    'locations': None,           # Optional [x, y] per department (uniformly random otherwise)
+}
+
+DEPARTMENT_COLUMNS = ['department', 'x', 'y', 'patients', 'avg_total_time', 'avg_wait_for_treatment',
+                      'avg_doctor_utilization', 'avg_treatment_queue_length', 'diversion_fraction',
+                      'walk_ins', 'ambulance_calls', 'ambulance_arrivals', 'diverted_out', 'diverted_in']
+
+
+class Department:
+    """State of one ED in the network"""
+    __slots__ = ('index', 'x', 'y', 'config', 'streams', 'ambulance_interarrival', 'nurses', 'doctors',
+                 'patients', 'on_diversion', 'diversion', 'routes', 'walk_ins', 'ambulance_calls',
+                 'ambulance_arrivals', 'diverted_out', 'diverted_in')
+
+    def __init__(self, index, x, y, config, seed, ambulance_fraction):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.config = config
+
+        # Walk-ins and ambulance calls split the department's arrival rate (or rate schedule)
+        block_size = config.get('random_block_size', NETWORK_BLOCK_SIZE)
+        self.streams = RandomStreams(seed, self.arrival_share(config, 1 - ambulance_fraction), block_size)
+        self.ambulance_interarrival = None
+        if ambulance_fraction > 0:
+            self.ambulance_interarrival = interarrival_stream(np.random.default_rng([seed, AMBULANCE_STREAM]),
+                                                              self.arrival_share(config, ambulance_fraction),
+                                                              block_size, antithetic_side(config))
+
+        self.nurses = ServerPool(config['num_triage_nurses'])
+        self.doctors = ServerPool(config['num_doctors'])
+        self.patients = PatientStore(capacity=int(expected_arrivals(config) * 1.2) + 64)
+
+        self.on_diversion = False
+        self.diversion = TimeWeightedStat(0, 0)
+        self.routes = []  # (department, travel time) for this department and its neighbours, nearest first
+        self.walk_ins = 0
+        self.ambulance_calls = 0
+        self.ambulance_arrivals = 0
+        self.diverted_out = 0
+        self.diverted_in = 0
+
+    @staticmethod
+    def arrival_share(config, fraction):
+        """Config whose arrival rate (and schedule, if any) is `fraction` of the department's"""
+        share = {**config, 'arrival_rate': config['arrival_rate'] * fraction}
+        if config.get('arrival_schedule'):
+            share['arrival_schedule'] = scaled_schedule(config['arrival_schedule'], fraction)
+        return share
+
+
+class NetworkSimulation:
+    """Many EDs with ambulance routing and diversion, run on one heap event calendar"""
+
+    def __init__(self, config):
+        self.config = config
+        self.env = EventCalendar()
+
+        self.config.setdefault('random_seed', 42)
+        self.config.setdefault('replication', 0)
+        self.config.setdefault('compact_patients', True)
+        self.config.setdefault('verbosity', 1)
+        self.network = {**NETWORK_DEFAULTS, **self.config['network']}
+        if self.config.get('trace'):
+            raise ValueError("trace-driven arrivals are not supported in network mode")
+
+        self.seed = derive_run_seed(config)
+        self.patient_class = CompactPatient if config['compact_patients'] else Patient
+        self.patient_id_counter = 0
+        self.telemetry = TelemetryReporter(config.get('telemetry'), config.get('run_id', 0), config['replication'],
+                                           config['simulation_time'], config.get('purpose', ''))
+        self.departments = self.create_departments()
+
+        self.output_dir = Path(config.get('output_directory', 'simulation_runs'))
+        self.output_dir.mkdir(exist_ok=True)
+
+    def create_departments(self):
+        """Place the departments and give each its nearest neighbours for ambulance routing"""
+        network = self.network
+        num_departments = network['num_departments']
+        if network['locations'] is not None:
+            locations = np.asarray(network['locations'], dtype=np.float64)
+        else:
+            layout = np.random.default_rng([self.seed, LAYOUT_STREAM])
+            locations = layout.uniform(0, network['region_size'], size=(num_departments, 2))
+        overrides = network['departments'] or [{}] * num_departments
+        if len(locations) != num_departments or len(overrides) != num_departments:
+            raise ValueError("network locations and departments need one entry per department")
+
+        departments = [
+            Department(index, float(x), float(y), {**self.config, **overrides[index]},
+                       derive_seed(self.seed, index), network['ambulance_fraction'])
+            for index, (x, y) in enumerate(locations)
+        ]
+
+        # One distance row at a time keeps setup memory linear in the number of departments
+        neighbours = min(network['neighbours'], num_departments - 1)
+        for department, location in zip(departments, locations):
+            distances = np.hypot(*(locations - location).T)
+            distances[department.index] = np.inf
+            nearest = np.argpartition(distances, neighbours)[:neighbours] if neighbours > 0 else []
+            nearest = sorted(nearest, key=distances.__getitem__)
+            department.routes = [(department, network['transport_time'])] + [
+                (departments[other], network['transport_time'] + float(distances[other]) / network['travel_speed'])
+                for other in nearest
+            ]
+        return departments
+
+    @staticmethod
+    def route(home):
+        """Nearest department not on diversion among home and its neighbours (home if all are)"""
+        for route in home.routes:
+            if not route[0].on_diversion:
+                return route
+        return home.routes[0]
+
+    def simulate(self, until):
+        """Process calendar events for the whole network until the clock reaches `until`"""
+        env = self.env
+        calendar = []
+        sequence = count()  # Breaks time ties in scheduling order
+        push = heapq.heappush
+        pop = heapq.heappop
+        patient_class = self.patient_class
+        route = self.route
+        threshold = self.network['diversion_threshold']
+        release = self.network['diversion_release']
+        telemetry = self.telemetry if self.telemetry.enabled else None
+        events = 0  # Events processed
+
+        def new_patient(department, arrival_time):
+            patient = patient_class(self.patient_id_counter, arrival_time)
+            patient.set_triage_level(department.streams.triage_level())
+            self.patient_id_counter += 1
+            return patient
+
+        def admit(department, patient, time):
+            patient.triage_start_time = time
+            if department.nurses.request(patient, time):
+                start_triage(department, patient, time)
+
+        def start_triage(department, patient, time):
+            patient.triage_start_time = time
+            push(calendar, (time + department.streams.triage_time(), next(sequence), TRIAGE_END, department, patient))
+
+        def start_treatment(department, patient, time):
+            patient.treatment_start_time = time
+            push(calendar, (time + department.streams.treatment_time(), next(sequence), TREATMENT_END,
+                            department, patient))
+
+        def update_diversion(department, time):
+            waiting = len(department.doctors.queue)
+            if department.on_diversion:
+                if waiting <= release:
+                    department.on_diversion = False
+                    department.diversion.update(time, 0)
+            elif waiting >= threshold:
+                department.on_diversion = True
+                department.diversion.update(time, 1)
+
+        for department in self.departments:
+            push(calendar, (department.streams.interarrival(), next(sequence), WALK_IN, department, None))
+            if department.ambulance_interarrival is not None:
+                push(calendar, (department.ambulance_interarrival(), next(sequence), AMBULANCE_CALL, department, None))
+
+        while calendar and calendar[0][0] < until:
+            time, _, kind, department, patient = pop(calendar)
+            env.now = time
+            events += 1
+
+            if kind == WALK_IN:
+                if telemetry is not None and telemetry.due():
+                    telemetry.events = events
+                    telemetry.send('running', time, self.patients_completed())
+                push(calendar, (time + department.streams.interarrival(), next(sequence), WALK_IN, department, None))
+                department.walk_ins += 1
+                admit(department, new_patient(department, time), time)
+
+            elif kind == AMBULANCE_CALL:
+                push(calendar, (time + department.ambulance_interarrival(), next(sequence), AMBULANCE_CALL,
+                                department, None))
+                department.ambulance_calls += 1
+                target, travel_time = route(department)
+                if target is not department:
+                    department.diverted_out += 1
+                    target.diverted_in += 1
+                patient = new_patient(department, time + travel_time)
+                push(calendar, (time + travel_time, next(sequence), AMBULANCE_ARRIVAL, target, patient))
+
+            elif kind == AMBULANCE_ARRIVAL:
+                department.ambulance_arrivals += 1
+                admit(department, patient, time)
+
+            elif kind == TRIAGE_END:
+                patient.triage_end_time = time
+                next_patient = department.nurses.release(time)
+                if department.doctors.request(patient, time):
+                    start_treatment(department, patient, time)
+                else:
+                    update_diversion(department, time)
+                if next_patient is not None:
+                    start_triage(department, next_patient, time)
+
+            else:
+                patient.treatment_end_time = time
+                next_patient = department.doctors.release(time)
+                department.patients.append(patient)
+                if next_patient is not None:
+                    start_treatment(department, next_patient, time)
+                    update_diversion(department, time)
+
+        env.now = until
+        for department in self.departments:
+            for stat in (department.nurses.busy, department.doctors.busy, department.doctors.queue_length,
+                         department.diversion):
+                stat.finalize(until)
+        self.telemetry.events = events
+
+    def patients_completed(self):
+        return sum(len(department.patients) for department in self.departments)
+
+    def department_table(self):
+        """One row per department: load, waits, utilization and diversion (columns as arrays)"""
+        now = self.env.now
+        rows = {name: [] for name in DEPARTMENT_COLUMNS}
+        for department in self.departments:
+            patients = department.patients
+            doctors = department.doctors
+            values = {
+                'department': department.index,
+                'x': department.x,
+                'y': department.y,
+                'patients': len(patients),
+                'avg_total_time': patients.column('total_time_in_system').mean() if len(patients) else np.nan,
+                'avg_wait_for_treatment': patients.column('wait_for_treatment').mean() if len(patients) else np.nan,
+                'avg_doctor_utilization': doctors.busy.mean(now) / doctors.capacity,
+                'avg_treatment_queue_length': doctors.queue_length.mean(now),
+                'diversion_fraction': department.diversion.mean(now),
+                'walk_ins': department.walk_ins,
+                'ambulance_calls': department.ambulance_calls,
+                'ambulance_arrivals': department.ambulance_arrivals,
+                'diverted_out': department.diverted_out,
+                'diverted_in': department.diverted_in,
+            }
+            for name, value in values.items():
+                rows[name].append(value)
+        return {name: np.asarray(values) for name, values in rows.items()}
+
+    def calculate_system_metrics(self):
+        """Network-wide patient metrics plus diversion totals"""
+        patients = PatientStore.concatenate([department.patients for department in self.departments])
+        if not len(patients):
+            return {}
+        metrics = patients.patient_metrics(self.env.now)
+        metrics['metrics_by_triage_level'] = patients.metrics_by_triage_level()
+
+        table = self.department_table()
+        metrics.update({
+            'num_departments': len(self.departments),
+            'avg_doctor_utilization': float(table['avg_doctor_utilization'].mean()),
+            'max_doctor_utilization': float(table['avg_doctor_utilization'].max()),
+            'ambulance_calls': int(table['ambulance_calls'].sum()),
+            'diverted_ambulances': int(table['diverted_out'].sum()),
+            'avg_diversion_fraction': float(table['diversion_fraction'].mean()),
+            'max_diversion_fraction': float(table['diversion_fraction'].max()),
+        })
+        return metrics
+
+    def result_tables(self):
+        """Tables for the consolidated result store"""
+        return {'departments': self.department_table()}
+
+    def export_data(self, run_id):
+        """Export the department table and network metrics; returns flat metrics"""
+        run_dir = self.output_dir / run_directory_name(self.config, run_id)
+        run_dir.mkdir(exist_ok=True)
+
+        store = ResultStore.from_config(self.config)
+        if store is not None:
+            for table, columns in self.result_tables().items():
+                store.write(table, columns, run_id, self.config['replication'])
+        if store is None or self.config['result_store'].get('csv', True):
+            import pandas as pd
+            pd.DataFrame(self.department_table()).to_csv(run_dir / "departments.csv", index=False)
+
+        system_metrics = self.calculate_system_metrics()
+        with open(run_dir / "metrics.json", 'w') as f:
+            json.dump({
+                'run_id': run_id,
+                'timestamp': datetime.now().isoformat(),
+                'config': self.config,
+                'system_metrics': system_metrics,
+            }, f, indent=2, default=float)
+
+        metrics_flat = {
+            'run_id': run_id,
+            'replication': self.config['replication'],
+            'total_patients': system_metrics.get('total_patients_processed', 0),
+            'avg_total_time': system_metrics.get('avg_total_time', 0),
+            'avg_wait_for_treatment': system_metrics.get('avg_wait_for_treatment', 0),
+            'throughput': system_metrics.get('throughput', 0),
+            'avg_doctor_utilization': system_metrics.get('avg_doctor_utilization', 0),
+            'num_departments': len(self.departments),
+            'diverted_ambulances': system_metrics.get('diverted_ambulances', 0),
+            'avg_diversion_fraction': system_metrics.get('avg_diversion_fraction', 0),
+        }
+        for level, level_metrics in system_metrics.get('metrics_by_triage_level', {}).items():
+            metrics_flat[f"level_{level}_avg_wait_for_treatment"] = level_metrics['avg_wait_for_treatment']
+            metrics_flat[f"level_{level}_max_wait_for_treatment"] = level_metrics['max_wait_for_treatment']
+        return metrics_flat
+
+    def run(self, run_id):
+        """Run the network simulation"""
+        verbosity = self.config['verbosity']
+        if verbosity >= 1:
+            print(f"Starting network run {run_id} ({len(self.departments)} departments)")
+
+        self.telemetry.start()
+        start_time = datetime.now()
+        self.simulate(self.config['simulation_time'])
+        end_time = datetime.now()
+        self.telemetry.finish(self.env.now, self.patients_completed())
+
+        metrics = self.export_data(run_id)
+        metrics['real_world_duration'] = (end_time - start_time).total_seconds()
+        metrics['events_processed'] = self.telemetry.events
+
+        if verbosity >= 1:
+            print(f"Completed network run {run_id}: Processed {metrics['total_patients']} patients, "
+                  f"{metrics['diverted_ambulances']} ambulances diverted")
+        return metrics
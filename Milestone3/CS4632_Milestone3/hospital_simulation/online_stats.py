@@ -0,0 +1,197 @@
+import math
+
+TRIAGE_LEVELS = (1, 2, 3, 4, 5)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RunningStats:
+    """Welford accumulator for count, mean, variance, min and max of a stream"""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        """Sample variance (0 with fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Streaming quantile estimate in constant memory (Jain & Chlamtac P-square algorithm)"""
+    __slots__ = ('p', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []  # Holds the first five observations until the markers start
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Find the cell holding the value, widening the extremes if needed
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        positions = self.positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        desired = self.desired
+        increments = self.increments
+        for i in range(5):
+            desired[i] += increments[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = desired[i] - positions[i]
+            if ((offset >= 1 and positions[i + 1] - positions[i] > 1)
+                    or (offset <= -1 and positions[i - 1] - positions[i] < -1)):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i, step):
+        heights = self.heights
+        positions = self.positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+            + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+
+    @property
+    def value(self):
+        heights = self.heights
+        if not heights:
+            return math.nan
+        if len(heights) < 5:
+            return heights[min(int(round(self.p * (len(heights) - 1))), len(heights) - 1)]
+        return heights[2]
+
+
+class OnlinePatientMetrics:
+    """Constant-memory replacement for PatientStore that keeps only streaming statistics
+
+    Completed patients update Welford accumulators overall and per triage level,
+    plus P-square estimators of the wait for treatment, and no rows are kept.
+    It exposes the same patient_metrics / metrics_by_triage_level interface as
+    PatientStore, so calculate_system_metrics builds the same dict either way.
+    """
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self.quantiles = tuple(quantiles)
+        self.count = 0
+        self.total_time = RunningStats()
+        self.wait_for_triage = RunningStats()
+        self.wait_for_treatment = RunningStats()
+        self.triage_duration = RunningStats()
+        self.treatment_duration = RunningStats()
+        self.wait_quantiles = [P2Quantile(p) for p in self.quantiles]
+        self.levels = {level: self._new_level() for level in TRIAGE_LEVELS}
+
+    def _new_level(self):
+        return {
+            'total_time': RunningStats(),
+            'wait_for_treatment': RunningStats(),
+            'wait_quantiles': [P2Quantile(p) for p in self.quantiles],
+        }
+
+    def __len__(self):
+        return self.count
+
+    def append(self, patient):
+        """Fold one completed patient into the running statistics"""
+        wait_for_treatment = patient.treatment_start_time - patient.triage_end_time
+        total_time = patient.treatment_end_time - patient.arrival_time
+
+        self.count += 1
+        self.total_time.add(total_time)
+        self.wait_for_triage.add(patient.triage_start_time - patient.arrival_time)
+        self.wait_for_treatment.add(wait_for_treatment)
+        self.triage_duration.add(patient.triage_end_time - patient.triage_start_time)
+        self.treatment_duration.add(patient.treatment_end_time - patient.treatment_start_time)
+        for estimator in self.wait_quantiles:
+            estimator.add(wait_for_treatment)
+
+        level = self.levels[patient.triage_level]
+        level['total_time'].add(total_time)
+        level['wait_for_treatment'].add(wait_for_treatment)
+        for estimator in level['wait_quantiles']:
+            estimator.add(wait_for_treatment)
+
+    def _quantile_metrics(self, estimators):
+        return {f"p{round(estimator.p * 100):g}_wait_for_treatment": estimator.value
+                for estimator in estimators}
+
+    def patient_metrics(self, duration):
+        """Overall patient metrics, as calculate_system_metrics reports them"""
+        metrics = {
+            'total_patients_processed': self.count,
+            'simulation_duration': duration,
+            'throughput': self.count / duration,
+
+            # Patient time metrics
+            'avg_total_time': self.total_time.mean,
+            'avg_wait_for_triage': self.wait_for_triage.mean,
+            'avg_wait_for_treatment': self.wait_for_treatment.mean,
+
+            # Service time metrics
+            'avg_triage_time': self.triage_duration.mean,
+            'avg_treatment_time': self.treatment_duration.mean,
+
+            # Spread, only available from the streaming accumulators
+            'std_total_time': self.total_time.std,
+            'std_wait_for_treatment': self.wait_for_treatment.std,
+            'max_total_time': self.total_time.max,
+        }
+        metrics.update(self._quantile_metrics(self.wait_quantiles))
+        return metrics
+
+    def metrics_by_triage_level(self):
+        """Per-level patient metrics, as calculate_system_metrics reports them"""
+        by_level = {}
+        for level, stats in self.levels.items():
+            if stats['total_time'].count > 0:
+                by_level[level] = {
+                    'count': stats['total_time'].count,
+                    'avg_total_time': stats['total_time'].mean,
+                    'avg_wait_for_treatment': stats['wait_for_treatment'].mean,
+                    'max_wait_for_treatment': stats['wait_for_treatment'].max,
+                    'std_wait_for_treatment': stats['wait_for_treatment'].std,
+                    'min_wait_for_treatment': stats['wait_for_treatment'].min,
+                    **self._quantile_metrics(stats['wait_quantiles']),
+                }
+        return by_level
@@ -2,24 +2,22 @@ import random
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
-class Patient:
-    patient_id: int
-    arrival_time: float
-    triage_level: Optional[int] = None
-    priority: Optional[int] = None
-    treatment_time: Optional[float] = None
-    triage_start_time: Optional[float] = None
-    triage_end_time: Optional[float] = None
-    treatment_start_time: Optional[float] = None
-    treatment_end_time: Optional[float] = None
+TRIAGE_LEVELS = [1, 2, 3, 4, 5]
+TRIAGE_LEVEL_WEIGHTS = [0.05, 0.1, 0.35, 0.4, 0.1]  # Level 1-5 probabilities
+
+class PatientBehaviour:
+    """Methods shared by the Patient dataclass and its slotted CompactPatient variant"""
+    __slots__ = ()
 
-    def assign_triage_level(self):
+    def assign_triage_level(self, rng=random):
         """Assign triage level with realistic distribution"""
         # More realistic: fewer critical patients, more moderate cases
-        weights = [0.05, 0.1, 0.35, 0.4, 0.1]  # Level 1-5 probabilities
-        self.triage_level = random.choices([1, 2, 3, 4, 5], weights=weights)[0]
-        self.priority = 6 - self.triage_level  # Higher priority for lower levels
+        self.set_triage_level(rng.choices(TRIAGE_LEVELS, weights=TRIAGE_LEVEL_WEIGHTS)[0])
+
+    def set_triage_level(self, level):
+        """Set a triage level drawn elsewhere (e.g. from a RandomStreams table)"""
+        self.triage_level = level
+        self.priority = 6 - level  # Higher priority for lower levels
 
     def calculate_wait_times(self):
         """Calculate various wait times"""
@@ -38,4 +36,36 @@ class Patient:
         }
 
     def __str__(self):
-        return f"Patient {self.patient_id} (Level {self.triage_level})"
\ No newline at end of file
+        return f"Patient {self.patient_id} (Level {self.triage_level})"
+
+
+@dataclass
+class Patient(PatientBehaviour):
+    patient_id: int
+    arrival_time: float
+    triage_level: Optional[int] = None
+    priority: Optional[int] = None
+    treatment_time: Optional[float] = None
+    triage_time: Optional[float] = None
+    triage_start_time: Optional[float] = None
+    triage_end_time: Optional[float] = None
+    treatment_start_time: Optional[float] = None
+    treatment_end_time: Optional[float] = None
+
+
+class CompactPatient(PatientBehaviour):
+    """Patient with __slots__ instead of a per-instance __dict__, for long runs"""
+    __slots__ = ('patient_id', 'arrival_time', 'triage_level', 'priority', 'treatment_time', 'triage_time',
+                 'triage_start_time', 'triage_end_time', 'treatment_start_time', 'treatment_end_time')
+
+    def __init__(self, patient_id, arrival_time):
+        self.patient_id = patient_id
+        self.arrival_time = arrival_time
+        self.triage_level = None
+        self.priority = None
+        self.treatment_time = None
+        self.triage_time = None
+        self.triage_start_time = None
+        self.triage_end_time = None
+        self.treatment_start_time = None
+        self.treatment_end_time = None
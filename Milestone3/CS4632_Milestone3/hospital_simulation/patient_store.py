@@ -0,0 +1,125 @@
+import numpy as np
+
+# Columns written per completed patient, in export order
+PATIENT_COLUMNS = {
+    'patient_id': np.int64,
+    'triage_level': np.int8,
+    'arrival_time': np.float64,
+    'triage_start_time': np.float64,
+    'triage_end_time': np.float64,
+    'treatment_start_time': np.float64,
+    'treatment_end_time': np.float64,
+    'wait_for_triage': np.float64,
+    'triage_duration': np.float64,
+    'wait_for_treatment': np.float64,
+    'treatment_duration': np.float64,
+    'total_time_in_system': np.float64,
+}
+
+
+class PatientStore:
+    """Growable columnar store of completed patients backed by NumPy arrays
+
+    Completion writes straight into preallocated columns (capacity doubles when
+    full), and column() hands out zero-copy views for metrics and export.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = max(int(capacity), 1)
+        self.size = 0
+        self.columns = {name: np.empty(self.capacity, dtype=dtype)
+                        for name, dtype in PATIENT_COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def concatenate(cls, stores):
+        """One store holding the rows of several (e.g. every department of a network)"""
+        combined = cls(capacity=sum(len(store) for store in stores))
+        for name, values in combined.columns.items():
+            np.concatenate([store.column(name) for store in stores], out=values[:combined.capacity])
+        combined.size = sum(len(store) for store in stores)
+        return combined
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, values in self.columns.items():
+            grown = np.empty(self.capacity, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self.columns[name] = grown
+
+    def append(self, patient):
+        """Write one completed patient's times and waits into the next row"""
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        columns = self.columns
+        arrival = patient.arrival_time
+        triage_start = patient.triage_start_time
+        triage_end = patient.triage_end_time
+        treatment_start = patient.treatment_start_time
+        treatment_end = patient.treatment_end_time
+
+        columns['patient_id'][row] = patient.patient_id
+        columns['triage_level'][row] = patient.triage_level
+        columns['arrival_time'][row] = arrival
+        columns['triage_start_time'][row] = triage_start
+        columns['triage_end_time'][row] = triage_end
+        columns['treatment_start_time'][row] = treatment_start
+        columns['treatment_end_time'][row] = treatment_end
+        columns['wait_for_triage'][row] = triage_start - arrival
+        columns['triage_duration'][row] = triage_end - triage_start
+        columns['wait_for_treatment'][row] = treatment_start - triage_end
+        columns['treatment_duration'][row] = treatment_end - treatment_start
+        columns['total_time_in_system'][row] = treatment_end - arrival
+        self.size = row + 1
+
+    def column(self, name):
+        """Zero-copy view of the filled part of one column"""
+        return self.columns[name][:self.size]
+
+    def patient_metrics(self, duration, start_row=0):
+        """Overall patient metrics, as calculate_system_metrics reports them
+
+        `start_row` skips the first completions (a warm-up period), in which case
+        `duration` should be the time observed after it.
+        """
+        count = self.size - start_row
+        return {
+            'total_patients_processed': count,
+            'simulation_duration': duration,
+            'throughput': count / duration,
+
+            # Patient time metrics
+            'avg_total_time': self.column('total_time_in_system')[start_row:].mean(),
+            'avg_wait_for_triage': self.column('wait_for_triage')[start_row:].mean(),
+            'avg_wait_for_treatment': self.column('wait_for_treatment')[start_row:].mean(),
+
+            # Service time metrics
+            'avg_triage_time': self.column('triage_duration')[start_row:].mean(),
+            'avg_treatment_time': self.column('treatment_duration')[start_row:].mean(),
+        }
+
+    def metrics_by_triage_level(self, start_row=0):
+        """Per-level patient metrics, as calculate_system_metrics reports them"""
+        by_level = {}
+        triage_levels = self.column('triage_level')[start_row:]
+        total_time = self.column('total_time_in_system')[start_row:]
+        wait_for_treatment = self.column('wait_for_treatment')[start_row:]
+        for level in range(1, 6):
+            in_level = triage_levels == level
+            count = int(in_level.sum())
+            if count > 0:
+                by_level[level] = {
+                    'count': count,
+                    'avg_total_time': total_time[in_level].mean(),
+                    'avg_wait_for_treatment': wait_for_treatment[in_level].mean(),
+                    'max_wait_for_treatment': wait_for_treatment[in_level].max()
+                }
+        return by_level
+
+    def to_dataframe(self):
+        """Build a DataFrame over the filled rows (for export)"""
+        import pandas as pd
+        return pd.DataFrame({name: self.column(name) for name in PATIENT_COLUMNS}, copy=False)
@@ -0,0 +1,147 @@
+"""Analytic pre-screen of ED configurations before they are simulated
+
+Both stages are treated as M/M/c queues in tandem. Triage is a FCFS M/M/c
+queue, and by Burke's theorem it passes Poisson arrivals on to treatment.
+Treatment is an M/M/c queue with non-preemptive priority by triage level
+(Cobham's formula). The treatment time is the same for every level, so the
+overall mean wait does not depend on the serving order. That overall mean is
+what the FIFO doctor pools of the engines should show, while the per-level
+waits are those of the intended priority order.
+
+Every function takes NumPy arrays (or scalars) that broadcast together, so a
+whole parameter grid is evaluated at once:
+
+    nurses, doctors = np.meshgrid(np.arange(1, 5), np.arange(1, 9), indexing='ij')
+    analysis = analyze(0.1, 0.2, 0.067, nurses, doctors)
+
+The results are long-run (steady-state) figures. A shift-length run of a
+heavily loaded configuration will show shorter waits than these.
+"""
+import numpy as np
+
+from hospital_simulation.arrivals import expected_arrivals
+from hospital_simulation.patient import TRIAGE_LEVEL_WEIGHTS
+
+# Defaults for SimulationRunManager.prescreen_runs, overridable through base_config['prescreen']
+PRESCREEN_DEFAULTS = {
+    'enabled': True,
+    'skip_unstable': False,     # Drop scenarios whose triage or doctor utilization is >= 1 (a finite
+                                # shift can still be simulated past capacity, so they are only flagged)
+    'heavy_utilization': 0.95,  # Flag scenarios loaded beyond this as near-unstable
+    'light_utilization': 0.3,   # Flag doctor utilization below this as overstaffed
+    'adjust_horizons': False,   # Replace simulation_time by a horizon from the relaxation time
+    'relaxation_times': 50,     # Horizon length in relaxation times of the slower stage
+    'min_horizon': 480,
+    'max_horizon': 100_800,     # Ten weeks
+}
+
+
+def erlang_c(servers, offered_load):
+    """Probability that an arrival waits in M/M/c (offered_load = arrival rate / service rate)
+
+    Built from the Erlang-B recursion, which is stable for large server counts.
+    It returns 1 where the queue is unstable.
+    """
+    servers, offered_load = np.broadcast_arrays(np.asarray(servers), np.asarray(offered_load, dtype=np.float64))
+    blocking = np.ones(offered_load.shape)
+    for count in range(1, int(servers.max()) + 1):
+        step = offered_load * blocking / (count + offered_load * blocking)
+        blocking = np.where(count <= servers, step, blocking)
+    utilization = offered_load / servers
+    with np.errstate(divide='ignore', invalid='ignore'):
+        waiting = blocking / (1 - utilization * (1 - blocking))
+    return np.where(utilization < 1, waiting, 1.0)
+
+
+def mmc_wait(arrival_rate, service_rate, servers):
+    """Mean wait in queue of M/M/c; inf where unstable"""
+    arrival_rate = np.asarray(arrival_rate, dtype=np.float64)
+    capacity = np.asarray(servers) * np.asarray(service_rate, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wait = erlang_c(servers, arrival_rate / service_rate) / (capacity - arrival_rate)
+    return np.where(arrival_rate < capacity, wait, np.inf)
+
+
+def priority_waits(arrival_rate, service_rate, servers, weights=TRIAGE_LEVEL_WEIGHTS):
+    """Mean wait in queue per level of non-preemptive priority M/M/c (Cobham); last axis is the level
+
+    Level k waits W0 / ((1 - s[k-1]) (1 - s[k])), where s[k] is the load of levels
+    1..k and W0 = C(c, a) / (c mu). A level is unstable (inf) once s[k] >= 1,
+    while the levels above it may still be fine.
+    """
+    arrival_rate = np.asarray(arrival_rate, dtype=np.float64)[..., np.newaxis]
+    capacity = (np.asarray(servers) * np.asarray(service_rate, dtype=np.float64))[..., np.newaxis]
+    weights = np.asarray(weights, dtype=np.float64)
+    load_through = np.cumsum(arrival_rate * weights / capacity, axis=-1)
+    load_before = load_through - arrival_rate * weights / capacity
+    base = erlang_c(servers, np.asarray(arrival_rate[..., 0]) / service_rate)[..., np.newaxis] / capacity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        waits = base / ((1 - load_before) * (1 - load_through))
+    return np.where(load_through < 1, waits, np.inf)
+
+
+def relaxation_time(utilization, servers, service_rate):
+    """Rough time for an M/M/c queue to forget its initial state: 1 / (c mu (1 - sqrt(rho))^2)"""
+    utilization = np.asarray(utilization, dtype=np.float64)
+    capacity = np.asarray(servers) * np.asarray(service_rate, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relaxation = 1 / (capacity * (1 - np.sqrt(utilization)) ** 2)
+    return np.where(utilization < 1, relaxation, np.inf)
+
+
+def analyze(arrival_rate, triage_rate, treatment_rate, num_triage_nurses, num_doctors):
+    """Steady-state approximation of the two-stage ED over broadcast parameter arrays"""
+    arrival_rate = np.asarray(arrival_rate, dtype=np.float64)
+    triage_utilization = arrival_rate / (np.asarray(num_triage_nurses) * triage_rate)
+    doctor_utilization = arrival_rate / (np.asarray(num_doctors) * treatment_rate)
+    triage_wait = mmc_wait(arrival_rate, triage_rate, num_triage_nurses)
+    treatment_wait = mmc_wait(arrival_rate, treatment_rate, num_doctors)
+    return {
+        'triage_utilization': triage_utilization,
+        'doctor_utilization': doctor_utilization,
+        'stable': (triage_utilization < 1) & (doctor_utilization < 1),
+        'triage_wait': triage_wait,
+        'wait_for_treatment': treatment_wait,
+        'level_waits': priority_waits(arrival_rate, treatment_rate, num_doctors),
+        'total_time': triage_wait + 1 / triage_rate + treatment_wait + 1 / treatment_rate,
+        'relaxation_time': np.maximum(relaxation_time(triage_utilization, num_triage_nurses, triage_rate),
+                                      relaxation_time(doctor_utilization, num_doctors, treatment_rate)),
+    }
+
+
+def analyze_configs(configs):
+    """analyze() over a list of run configs; arrival schedules count with their mean rate over the horizon"""
+    arrival_rate = np.array([expected_arrivals(config) / config['simulation_time'] for config in configs])
+    return analyze(arrival_rate,
+                   np.array([config['triage_rate'] for config in configs]),
+                   np.array([config['treatment_rate'] for config in configs]),
+                   np.array([config['num_triage_nurses'] for config in configs]),
+                   np.array([config['num_doctors'] for config in configs]))
+
+
+def screen(configs, settings=None):
+    """One row per config: the approximation, flags and a suggested horizon"""
+    settings = {**PRESCREEN_DEFAULTS, **(settings or {})}
+    analysis = analyze_configs(configs)
+    horizons = np.clip(settings['relaxation_times'] * analysis['relaxation_time'],
+                       settings['min_horizon'], settings['max_horizon'])
+    rows = []
+    for index, config in enumerate(configs):
+        triage, doctors = analysis['triage_utilization'][index], analysis['doctor_utilization'][index]
+        if not analysis['stable'][index]:
+            flag = 'unstable'
+        elif max(triage, doctors) > settings['heavy_utilization']:
+            flag = 'heavy'
+        elif doctors < settings['light_utilization']:
+            flag = 'overstaffed'
+        else:
+            flag = ''
+        row = {'run_id': config['run_id'], 'purpose': config.get('purpose', ''), 'flag': flag,
+               'triage_utilization': float(triage), 'doctor_utilization': float(doctors),
+               'wait_for_treatment': float(analysis['wait_for_treatment'][index]),
+               'total_time': float(analysis['total_time'][index]),
+               'suggested_horizon': float(np.round(horizons[index]))}
+        for level, wait in enumerate(analysis['level_waits'][index], start=1):
+            row[f"level_{level}_wait_for_treatment"] = float(wait)
+        rows.append(row)
+    return rows
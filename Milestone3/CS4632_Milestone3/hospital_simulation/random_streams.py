@@ -0,0 +1,195 @@
+import random
+
+import numpy as np
+
+from hospital_simulation.arrivals import RateSchedule
+from hospital_simulation.patient import TRIAGE_LEVEL_WEIGHTS, TRIAGE_LEVELS
+from hospital_simulation.trace import TraceStreams
+
+DEFAULT_BLOCK_SIZE = 4096
+
+# One independent generator per stochastic input, so each is reproducible on its own
+STREAM_IDS = {'arrival': 0, 'triage_level': 1, 'triage': 2, 'treatment': 3}
+
+
+class VariateStream:
+    """Hands out variates one at a time from blocks drawn in a single vectorized call"""
+    __slots__ = ('draw_block', 'block_size', '_next')
+
+    def __init__(self, draw_block, block_size=DEFAULT_BLOCK_SIZE):
+        self.draw_block = draw_block
+        self.block_size = block_size
+        self._next = iter(()).__next__
+
+    def __call__(self):
+        try:
+            return self._next()
+        except StopIteration:
+            self._next = iter(self.draw_block(self.block_size)).__next__
+            return self._next()
+
+
+def standard_exponentials(generator, size, antithetic=None):
+    """Unit exponentials; with `antithetic` set, by inverting uniforms U (False) or 1 - U (True)
+
+    Inversion is slower than numpy's ziggurat sampler but lets the two members
+    of an antithetic pair turn the same uniforms into negatively correlated draws.
+    """
+    if antithetic is None:
+        return generator.standard_exponential(size)
+    uniforms = generator.random(size)
+    if antithetic:
+        return -np.log(np.maximum(uniforms, np.finfo(np.float64).tiny))
+    return -np.log1p(-uniforms)
+
+
+def exponential_stream(generator, rate, block_size=DEFAULT_BLOCK_SIZE, antithetic=None):
+    """Stream of exponential variates with the given rate"""
+    scale = 1.0 / rate
+    return VariateStream(lambda size: (standard_exponentials(generator, size, antithetic) * scale).tolist(),
+                         block_size)
+
+
+def discrete_stream(generator, values, weights, block_size=DEFAULT_BLOCK_SIZE, antithetic=None):
+    """Stream of values sampled by inverting a precomputed cumulative probability table"""
+    table = np.asarray(values)
+    cdf = np.cumsum(weights, dtype=np.float64)
+    cdf /= cdf[-1]
+    last = len(table) - 1
+
+    def draw_block(size):
+        uniforms = generator.random(size)
+        if antithetic:
+            uniforms = 1.0 - uniforms
+        indices = np.searchsorted(cdf, uniforms, side='right')
+        return table[np.minimum(indices, last)].tolist()
+
+    return VariateStream(draw_block, block_size)
+
+
+def scheduled_stream(generator, schedule, block_size=DEFAULT_BLOCK_SIZE, horizon=None, antithetic=None):
+    """Interarrival times of a non-homogeneous Poisson process, by cumulative-intensity inversion
+
+    Unit-rate arrival epochs (running sums of standard exponentials) are mapped
+    through the schedule's inverse cumulative intensity a block at a time, so
+    every arrival costs the same at any rate and nothing is rejected. With
+    `horizon`, the first block holds every arrival up to the horizon (plus the
+    first one after it), generated in one vectorized pass.
+    """
+    state = {'epoch': 0.0, 'time': 0.0, 'horizon': horizon}
+
+    def draw_block(size):
+        horizon = state['horizon']
+        if horizon is None:
+            epochs = state['epoch'] + np.cumsum(standard_exponentials(generator, size, antithetic))
+        else:
+            # Draw past the horizon's expected count with some margin, topping up in the rare shortfall
+            state['horizon'] = None
+            target = float(schedule.cumulative(horizon))
+            chunks = []
+            epoch = state['epoch']
+            while epoch <= target:
+                draws = int(target - epoch + 4 * np.sqrt(target - epoch + 1) + 16)
+                chunk = epoch + np.cumsum(standard_exponentials(generator, draws, antithetic))
+                chunks.append(chunk)
+                epoch = chunk[-1]
+            epochs = np.concatenate(chunks)
+            epochs = epochs[:np.searchsorted(epochs, target, side='right') + 1]
+        times = schedule.inverse(epochs)
+        gaps = np.diff(times, prepend=state['time'])
+        state['epoch'] = epochs[-1]
+        state['time'] = times[-1]
+        return gaps.tolist()
+
+    return VariateStream(draw_block, block_size)
+
+
+def interarrival_stream(generator, config, block_size=DEFAULT_BLOCK_SIZE, antithetic=None):
+    """Exponential gaps at arrival_rate, or gaps following config['arrival_schedule']
+
+    config['arrival_batch'] pre-generates the whole horizon's arrivals at once
+    (a constant arrival_rate is then treated as a one-segment schedule).
+    """
+    schedule = RateSchedule.from_config(config)
+    if schedule is None and not config.get('arrival_batch'):
+        return exponential_stream(generator, config['arrival_rate'], block_size, antithetic)
+    if schedule is None:
+        schedule = RateSchedule([0], [config['arrival_rate']])
+    horizon = config['simulation_time'] if config.get('arrival_batch') else None
+    return scheduled_stream(generator, schedule, block_size, horizon, antithetic)
+
+
+def antithetic_side(config):
+    """None without antithetic pairs, else whether this replication draws from 1 - U"""
+    if not config.get('antithetic'):
+        return None
+    return config.get('replication', 0) % 2 == 1
+
+
+class RandomStreams:
+    """Per-input random streams for one run, backed by numpy.random.Generator blocks
+
+    With config['antithetic'], replications 2k and 2k + 1 share a seed (see
+    derive_run_seed) and every draw is made by inversion, from U in the even
+    replication and from 1 - U in the odd one.
+    """
+
+    def __init__(self, seed, config, block_size=DEFAULT_BLOCK_SIZE):
+        antithetic = antithetic_side(config)
+        self.generators = {name: np.random.default_rng([seed, stream_id])
+                           for name, stream_id in STREAM_IDS.items()}
+        self.interarrival = interarrival_stream(self.generators['arrival'], config, block_size, antithetic)
+        self.triage_level = discrete_stream(self.generators['triage_level'], TRIAGE_LEVELS,
+                                            TRIAGE_LEVEL_WEIGHTS, block_size, antithetic)
+        self.triage_time = exponential_stream(self.generators['triage'], config['triage_rate'], block_size,
+                                              antithetic)
+        self.treatment_time = exponential_stream(self.generators['treatment'], config['treatment_rate'], block_size,
+                                                 antithetic)
+
+
+class PythonRandomStreams:
+    """Same interface as RandomStreams, drawing from one random.Random per call (previous behaviour)"""
+
+    def __init__(self, seed, config):
+        self.rng = random.Random(seed)
+        arrival_rate = config['arrival_rate']
+        triage_rate = config['triage_rate']
+        treatment_rate = config['treatment_rate']
+        schedule = RateSchedule.from_config(config)
+        if schedule is None:
+            self.interarrival = lambda: self.rng.expovariate(arrival_rate)
+        else:
+            self.interarrival = self.scheduled_interarrival(schedule)
+        self.triage_level = lambda: self.rng.choices(TRIAGE_LEVELS, weights=TRIAGE_LEVEL_WEIGHTS)[0]
+        self.triage_time = lambda: self.rng.expovariate(triage_rate)
+        self.treatment_time = lambda: self.rng.expovariate(treatment_rate)
+
+    def scheduled_interarrival(self, schedule):
+        """Inversion one arrival at a time, for the scheduled arrival rate"""
+        state = {'epoch': 0.0, 'time': 0.0}
+
+        def interarrival():
+            state['epoch'] += self.rng.expovariate(1.0)
+            time = float(schedule.inverse(state['epoch']))
+            gap = time - state['time']
+            state['time'] = time
+            return gap
+
+        return interarrival
+
+
+def create_random_streams(seed, config):
+    """Random streams selected by config['random_streams'] ('numpy' or 'python')
+
+    With config['trace'], arrivals are replayed from the trace and these streams
+    only fill in the service times it lacks.
+    """
+    if config.get('random_streams', 'numpy') == 'python':
+        if config.get('antithetic'):
+            raise ValueError("antithetic replications need random_streams 'numpy'")
+        streams = PythonRandomStreams(seed, config)
+    else:
+        streams = RandomStreams(seed, config, config.get('random_block_size', DEFAULT_BLOCK_SIZE))
+    if config.get('trace'):
+        return TraceStreams(config['trace'], streams)
+    return streams
@@ -0,0 +1,184 @@
+"""Content-addressed on-disk cache of finished simulation runs
+
+A run is identified by a hash of its full config (seed and replication
+included) and of the simulation source code, so any change to either gives
+a new key. Each entry holds the run's flat metrics and a copy of its export
+folder. Entries are directories whose modification time is refreshed on
+every hit, and evict() removes the least recently used ones until the cache
+fits its size cap.
+
+Command line (from the project folder):
+    python -m hospital_simulation.result_cache stats  [--directory DIR]
+    python -m hospital_simulation.result_cache clear  [--directory DIR]
+    python -m hospital_simulation.result_cache evict  [--directory DIR] [--max-megabytes N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from hospital_simulation.trace import trace_signature
+
+DEFAULT_DIRECTORY = '.simulation_cache'
+DEFAULT_MAX_MEGABYTES = 1024
+
+# Config keys that only say where or how results are delivered, not what they are
+NON_RESULT_KEYS = ('output_directory', 'purpose', 'result_cache', 'telemetry', 'verbosity')
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """Hash of the hospital_simulation sources, so model changes invalidate cached runs"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def run_key(config):
+    """Cache key of a run: its result-relevant config plus the code version"""
+    relevant = {key: value for key, value in config.items() if key not in NON_RESULT_KEYS}
+    if config.get('trace'):
+        relevant['trace_file'] = trace_signature(config['trace'])
+    payload = json.dumps({'config': relevant, 'code_version': code_version()}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_megabytes=DEFAULT_MAX_MEGABYTES):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_megabytes * 1024 * 1024)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Cache described by config['result_cache'], or None when caching is off"""
+        options = config.get('result_cache')
+        if not options:
+            return None
+        return cls(options.get('directory', DEFAULT_DIRECTORY), options.get('max_megabytes', DEFAULT_MAX_MEGABYTES))
+
+    def entry_path(self, key):
+        return self.directory / key[:2] / key
+
+    def load(self, config, run_dir):
+        """Return cached flat metrics and restore the exports into run_dir, or None on a miss"""
+        entry = self.entry_path(run_key(config))
+        metrics_file = entry / "metrics_flat.json"
+        if not metrics_file.exists():
+            return None
+        with open(metrics_file) as f:
+            metrics = json.load(f)
+        exports = entry / "exports"
+        if exports.exists():
+            shutil.copytree(exports, run_dir, dirs_exist_ok=True)
+        os.utime(entry)  # Mark as recently used
+        return metrics
+
+    def load_tables(self, config):
+        """Cached result-store tables of a run as {table: {column: array}}"""
+        tables_file = self.entry_path(run_key(config)) / "tables.npz"
+        if not tables_file.exists():
+            return {}
+        tables = {}
+        with np.load(tables_file) as archive:
+            for key in archive.files:
+                table, column = key.split('/', 1)
+                tables.setdefault(table, {})[column] = archive[key]
+        return tables
+
+    def store(self, config, metrics, run_dir, tables=None):
+        """Save a finished run; written to a temporary folder and renamed into place
+
+        `tables` (the run's result-store tables) are kept too, so a cache hit can
+        refill the result store as well as the export folder.
+        """
+        entry = self.entry_path(run_key(config))
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix='.staging-'))
+        try:
+            with open(staging / "metrics_flat.json", 'w') as f:
+                json.dump(metrics, f, indent=2, default=float)
+            if Path(run_dir).exists():
+                shutil.copytree(run_dir, staging / "exports")
+            if tables:
+                np.savez(staging / "tables.npz", **{f"{table}/{column}": np.asarray(values)
+                                                    for table, columns in tables.items()
+                                                    for column, values in columns.items()})
+            os.rename(staging, entry)
+        except OSError:
+            # Another worker stored the same run first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def entries(self):
+        """(last used, size in bytes, path) of every cache entry"""
+        found = []
+        for shard in self.directory.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                if entry.name.startswith('.staging-'):
+                    continue
+                size = sum(path.stat().st_size for path in entry.rglob('*') if path.is_file())
+                found.append((entry.stat().st_mtime, size, entry))
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Invalidate every cached run"""
+        removed = len(self.entries())
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            'entries': len(entries),
+            'megabytes': sum(size for _, size, _ in entries) / (1024 * 1024),
+            'max_megabytes': self.max_bytes / (1024 * 1024),
+            'oldest_use': time.ctime(min(mtime for mtime, _, _ in entries)) if entries else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the simulation result cache")
+    parser.add_argument('command', choices=['stats', 'clear', 'evict'])
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY)
+    parser.add_argument('--max-megabytes', type=float, default=DEFAULT_MAX_MEGABYTES)
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.directory, args.max_megabytes)
+    if args.command == 'clear':
+        print(f"Removed {cache.clear()} cached runs from {cache.directory}")
+    elif args.command == 'evict':
+        print(f"Evicted {cache.evict()} cached runs from {cache.directory}")
+    else:
+        for name, value in cache.stats().items():
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
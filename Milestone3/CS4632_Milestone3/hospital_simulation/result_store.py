@@ -0,0 +1,178 @@
+"""Append-only columnar store for the tables of many runs
+
+Every write appends a chunk: a folder of one .npy file per column plus a
+meta.json with its row count and run ids. Columns are read back memory-mapped,
+so a read only touches the chunks and columns it asks for. Workers append
+chunks independently (each is staged and renamed into place), and compact()
+merges a table's chunks into one to keep the file count down after a sweep.
+
+Rows carrying run_id and replication belong to that run: writing the same
+(run_id, replication) again supersedes its rows in older chunks, so a re-run
+sweep replaces its results instead of duplicating them. Chunks written with
+different column sets are read back aligned, with the columns a chunk lacks
+filled with NaN (or '' for text).
+
+    store/
+        patients/chunk_.../{patient_id,arrival_time,...,run_id,replication}.npy
+        resource_utilization/...
+        queue_history/...
+        runs/...
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_DIRECTORY = 'simulation_runs_m3/results'
+
+
+def _row_keys(run_ids, replications):
+    """(run_id, replication) pairs packed into single int64 keys"""
+    return (np.asarray(run_ids, dtype=np.int64) << 32) | np.asarray(replications, dtype=np.int64)
+
+
+def _missing(dtype, rows):
+    """Filler for a column a chunk was written without"""
+    if dtype.kind in 'US':
+        return np.full(rows, '', dtype=dtype)
+    return np.full(rows, np.nan)
+
+
+def _storable(values):
+    """NumPy array that np.save can write without pickling (strings become fixed width)"""
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = array.astype(str)
+    return array
+
+
+class ResultStore:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Store described by config['result_store'], or None when it is off
+
+        It defaults to <output_directory>/results, so runs written elsewhere keep
+        their tables out of the project's store.
+        """
+        options = config.get('result_store')
+        if not options:
+            return None
+        default = Path(config['output_directory']) / 'results' if 'output_directory' in config else DEFAULT_DIRECTORY
+        return cls(options.get('directory', default))
+
+    def tables(self):
+        return sorted(path.name for path in self.directory.iterdir() if path.is_dir())
+
+    def chunks(self, table):
+        table_dir = self.directory / table
+        if not table_dir.exists():
+            return []
+        return sorted(path for path in table_dir.iterdir() if path.is_dir() and not path.name.startswith('.'))
+
+    def write(self, table, columns, run_id=None, replication=None):
+        """Append one chunk; run_id/replication columns are added when given"""
+        arrays = {name: _storable(values) for name, values in columns.items()}
+        rows = len(next(iter(arrays.values()))) if arrays else 0
+        if rows == 0:
+            return None
+        if run_id is not None:
+            arrays['run_id'] = np.full(rows, run_id, dtype=np.int32)
+            arrays['replication'] = np.full(rows, replication or 0, dtype=np.int32)
+
+        table_dir = self.directory / table
+        table_dir.mkdir(exist_ok=True)
+        name = f"chunk_{uuid.uuid4().hex}"
+        staging = table_dir / f".staging-{name}"
+        staging.mkdir()
+        for column, values in arrays.items():
+            np.save(staging / f"{column}.npy", values)
+        run_ids = sorted(set(np.unique(arrays['run_id']).tolist())) if 'run_id' in arrays else []
+        meta = {'rows': rows, 'columns': list(arrays), 'run_ids': run_ids, 'written': time.time_ns()}
+        if 'run_id' in arrays and 'replication' in arrays:
+            meta['keys'] = np.unique(_row_keys(arrays['run_id'], arrays['replication'])).tolist()
+        (staging / "meta.json").write_text(json.dumps(meta))
+        os.rename(staging, table_dir / name)
+        return table_dir / name
+
+    def _chunk_metas(self, table):
+        """(chunk, meta) pairs, oldest write first"""
+        metas = []
+        for chunk in self.chunks(table):
+            meta = json.loads((chunk / "meta.json").read_text())
+            if 'keys' not in meta and {'run_id', 'replication'} <= set(meta['columns']):
+                # Chunk from before keys were recorded
+                meta['keys'] = np.unique(_row_keys(np.load(chunk / "run_id.npy", mmap_mode='r'),
+                                                   np.load(chunk / "replication.npy", mmap_mode='r'))).tolist()
+            metas.append((chunk, meta))
+        metas.sort(key=lambda item: item[1].get('written', 0))
+        return metas
+
+    def read_columns(self, table, columns=None, run_ids=None):
+        """Dict of column arrays, memory-mapped and only for the chunks and columns asked for"""
+        wanted_runs = set(run_ids) if run_ids is not None else None
+        metas = self._chunk_metas(table)
+
+        # Each (run_id, replication) is read from the chunk that wrote it last
+        latest = {}
+        for position, (_, meta) in enumerate(metas):
+            for key in meta.get('keys', ()):
+                latest[key] = position
+
+        names = list(columns) if columns else list(dict.fromkeys(name for _, meta in metas for name in meta['columns']))
+        dtypes = {}
+        for chunk, meta in metas:
+            for name in names:
+                if name not in dtypes and name in meta['columns']:
+                    dtypes[name] = np.load(chunk / f"{name}.npy", mmap_mode='r').dtype
+
+        pieces = {name: [] for name in names if name in dtypes}
+        for position, (chunk, meta) in enumerate(metas):
+            if wanted_runs is not None and not wanted_runs.intersection(meta['run_ids']):
+                continue
+            mask = None
+            if wanted_runs is not None:
+                mask = np.isin(np.load(chunk / "run_id.npy", mmap_mode='r'), list(wanted_runs))
+            stale = [key for key in meta.get('keys', ()) if latest[key] != position]
+            if stale:
+                current = ~np.isin(_row_keys(np.load(chunk / "run_id.npy", mmap_mode='r'),
+                                             np.load(chunk / "replication.npy", mmap_mode='r')), stale)
+                mask = current if mask is None else mask & current
+            rows = meta['rows'] if mask is None else int(mask.sum())
+            if rows == 0:
+                continue
+            for name in pieces:
+                if name in meta['columns']:
+                    values = np.load(chunk / f"{name}.npy", mmap_mode='r')
+                    pieces[name].append(values if mask is None else values[mask])
+                else:
+                    pieces[name].append(_missing(dtypes[name], rows))
+        return {name: parts[0] if len(parts) == 1 else np.concatenate(parts)
+                for name, parts in pieces.items() if parts}
+
+    def read_table(self, table, columns=None, run_ids=None):
+        """read_columns as a pandas DataFrame"""
+        import pandas as pd
+        return pd.DataFrame(self.read_columns(table, columns, run_ids))
+
+    def export_csv(self, table, path, columns=None, run_ids=None):
+        """Write (part of) a table as CSV, the optional text view of the store"""
+        self.read_table(table, columns, run_ids).to_csv(path, index=False)
+
+    def compact(self, table=None):
+        """Merge each table's chunks into a single chunk"""
+        for name in [table] if table else self.tables():
+            chunks = self.chunks(name)
+            if len(chunks) < 2:
+                continue
+            # run_id stays a column, so the merged chunk still lists its runs for skipping
+            self.write(name, self.read_columns(name))
+            for chunk in chunks:
+                shutil.rmtree(chunk)
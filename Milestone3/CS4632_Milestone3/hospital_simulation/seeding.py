@@ -0,0 +1,25 @@
+import numpy as np
+
+
+def derive_seed(base_seed, run_id=0, replication=0):
+    """Derive an independent seed for one run from (base seed, run_id, replication)
+
+    The same triple always gives the same seed, so a run's results do not depend
+    on which worker process executes it or in which order runs are scheduled.
+    """
+    sequence = np.random.SeedSequence([int(base_seed), int(run_id), int(replication)])
+    return int(sequence.generate_state(1, dtype=np.uint64)[0])
+
+
+def derive_run_seed(config):
+    """Seed of the run described by config, honouring the variance-reduction options
+
+    With common_random_numbers every scenario of a replication gets the same
+    seed (run_id is left out), so the same patients arrive in every scenario;
+    with antithetic, replications 2k and 2k + 1 share one seed as a pair.
+    """
+    run_id = 0 if config.get('common_random_numbers') else config.get('run_id', 0)
+    replication = config.get('replication', 0)
+    if config.get('antithetic'):
+        replication //= 2
+    return derive_seed(config['random_seed'], run_id, replication)
@@ -0,0 +1,182 @@
+"""Sequential search for the cheapest staffing that meets wait-time limits
+
+Every (num_triage_nurses, num_doctors) pair in the configured ranges is a
+candidate, costed as nurse_cost * nurses + doctor_cost * doctors. A candidate
+is feasible when the expected value of each constraint metric (e.g. the level-1
+max_wait_for_treatment of a replication) is within its limit. Candidates are
+simulated in stages whose replication counts double from min_replications to
+max_replications, and after every stage each one still open is tested against
+every constraint with one-sided t bounds:
+
+  - feasible when every upper bound is within its limit,
+  - infeasible when any lower bound exceeds its limit (with monotone set, so is
+    every candidate with no more nurses and no more doctors),
+  - dominated, and no longer simulated, once a cheaper candidate is feasible.
+
+Each bound is taken at (1 - confidence) / (candidates * constraints * stages),
+so with probability at least `confidence` every feasible/infeasible decision of
+the search is correct (Bonferroni, covering the repeated looks too).
+"""
+import math
+
+from hospital_simulation.confidence import confidence_interval
+
+# Defaults for StaffingSearch, overridable through base_config['staffing_search']
+STAFFING_DEFAULTS = {
+    'nurses': [1, 4],          # Inclusive range of num_triage_nurses to search
+    'doctors': [1, 8],         # Inclusive range of num_doctors to search
+    'nurse_cost': 1.0,
+    'doctor_cost': 2.0,
+    'constraints': {           # Metric -> limit on its expected value, in minutes
+        'level_1_max_wait_for_treatment': 10.0,
+        'level_2_max_wait_for_treatment': 30.0,
+    },
+    'objective': 'avg_total_time',  # Breaks ties between feasible candidates of equal cost
+    'confidence': 0.95,
+    'min_replications': 5,
+    'max_replications': 80,
+    'monotone': True,          # Assume more staff never raises a constraint metric
+    'common_random_numbers': True,
+}
+
+
+class Candidate:
+    __slots__ = ('run_id', 'nurses', 'doctors', 'cost', 'runs', 'status', 'reason', 'bounds')
+
+    def __init__(self, nurses, doctors, cost):
+        self.run_id = None     # Scenario run_id, numbered in cost order
+        self.nurses = nurses
+        self.doctors = doctors
+        self.cost = cost
+        self.runs = []
+        self.status = 'open'   # open, feasible, infeasible, dominated or undecided
+        self.reason = ''
+        self.bounds = {}       # Constraint metric -> (mean, half-width) at the last look
+
+    @property
+    def label(self):
+        return f"{self.nurses} nurses, {self.doctors} doctors"
+
+    def values(self, metric):
+        # A triage level with no patients in a replication had no wait
+        return [run.get(metric, 0.0) for run in self.runs]
+
+
+class StaffingSearch:
+    def __init__(self, settings):
+        self.settings = settings
+        self.constraints = settings['constraints']
+        if not self.constraints:
+            raise ValueError("staffing_search needs at least one constraint")
+        nurses = range(settings['nurses'][0], settings['nurses'][1] + 1)
+        doctors = range(settings['doctors'][0], settings['doctors'][1] + 1)
+        self.candidates = sorted(
+            (Candidate(n, d, settings['nurse_cost'] * n + settings['doctor_cost'] * d)
+             for n in nurses for d in doctors),
+            key=lambda candidate: (candidate.cost, candidate.doctors, candidate.nurses))
+        if not self.candidates:
+            raise ValueError("staffing_search ranges contain no candidates")
+        for run_id, candidate in enumerate(self.candidates, start=1):
+            candidate.run_id = run_id
+
+        # Replication counts after each stage, doubling up to max_replications
+        self.stages = [settings['min_replications']]
+        while self.stages[-1] < settings['max_replications']:
+            self.stages.append(min(2 * self.stages[-1], settings['max_replications']))
+
+        # Two-sided confidence whose one-sided tail is the Bonferroni share of the error
+        alpha = (1 - settings['confidence']) / (len(self.candidates) * len(self.constraints) * len(self.stages))
+        self.bound_confidence = 1 - 2 * alpha
+
+    def open_candidates(self):
+        return [candidate for candidate in self.candidates if candidate.status == 'open']
+
+    def next_batch(self):
+        """(candidate, replication) pairs to simulate in the next stage"""
+        batch = []
+        for candidate in self.open_candidates():
+            target = next(count for count in self.stages if count > len(candidate.runs))
+            batch.extend((candidate, replication) for replication in range(len(candidate.runs), target))
+        return batch
+
+    def update(self):
+        """Test every open candidate after a stage and eliminate what can be decided"""
+        for candidate in self.open_candidates():
+            feasible = True
+            for metric, limit in self.constraints.items():
+                mean, half_width = confidence_interval(candidate.values(metric), self.bound_confidence)
+                candidate.bounds[metric] = (mean, half_width)
+                if mean - half_width > limit:
+                    self._mark_infeasible(candidate, f"{metric} above {limit:g}")
+                    break
+                feasible = feasible and mean + half_width <= limit
+            if candidate.status != 'open':
+                continue
+            if feasible:
+                candidate.status = 'feasible'
+            elif len(candidate.runs) >= self.settings['max_replications']:
+                candidate.status = 'undecided'
+                candidate.reason = "bounds still straddle a limit at max_replications"
+
+        best = self.best()
+        if best is not None:
+            for candidate in self.open_candidates():
+                if candidate.cost > best.cost:
+                    candidate.status = 'dominated'
+                    candidate.reason = f"costs more than feasible {best.label}"
+
+    def _mark_infeasible(self, candidate, reason):
+        candidate.status = 'infeasible'
+        candidate.reason = reason
+        if not self.settings['monotone']:
+            return
+        # Fewer of both staff types can only wait longer
+        for other in self.open_candidates():
+            if other.nurses <= candidate.nurses and other.doctors <= candidate.doctors:
+                other.status = 'infeasible'
+                other.reason = f"has no more staff than infeasible {candidate.label}"
+
+    def finished(self):
+        return not self.open_candidates()
+
+    def best(self):
+        """Cheapest feasible candidate; equal costs are ranked by the objective's sample mean"""
+        feasible = [candidate for candidate in self.candidates if candidate.status == 'feasible']
+        if not feasible:
+            return None
+        cost = min(candidate.cost for candidate in feasible)
+        objective = self.settings['objective']
+        return min((candidate for candidate in feasible if candidate.cost == cost),
+                   key=lambda candidate: confidence_interval(candidate.values(objective))[0])
+
+    def statement(self):
+        """Plain-language result with its confidence level"""
+        confidence = self.settings['confidence']
+        limits = ", ".join(f"{metric} <= {limit:g}" for metric, limit in self.constraints.items())
+        best = self.best()
+        if best is None:
+            return f"No candidate could be shown to meet {limits} at {confidence:.0%} confidence."
+        statement = (f"With {confidence:.0%} confidence, {best.label} (cost {best.cost:g}) meets {limits}, "
+                     f"and every cheaper candidate that was decided misses a limit.")
+        undecided = [candidate.label for candidate in self.candidates
+                     if candidate.status == 'undecided' and candidate.cost < best.cost]
+        if undecided:
+            statement += f" Cheaper but undecided after max_replications: {'; '.join(undecided)}."
+        return statement
+
+    def table(self):
+        """One row per candidate: staffing, cost, replications, decision and constraint bounds"""
+        rows = []
+        for candidate in self.candidates:
+            row = {'num_triage_nurses': candidate.nurses, 'num_doctors': candidate.doctors,
+                   'cost': candidate.cost, 'replications': len(candidate.runs),
+                   'status': candidate.status, 'reason': candidate.reason}
+            for metric in self.constraints:
+                mean, half_width = candidate.bounds.get(metric, (math.nan, math.nan))
+                row[f"{metric}_mean"] = mean
+                row[f"{metric}_bound"] = half_width
+            rows.append(row)
+        return rows
+
+    def simulated_runs(self):
+        return sum(len(candidate.runs) for candidate in self.candidates)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from hospital_simulation.confidence import t_quantile
+
+MSER_BATCH = 5
+
+
+def mser5_truncation(values, max_fraction=0.5):
+    """Warm-up length (in observations) chosen by MSER-5
+
+    The series is averaged in batches of five and the truncation point d that
+    minimises the marginal standard error of the remaining batch means,
+    var(Z[d:]) / (k - d), is picked. Only the first `max_fraction` of the run is
+    considered, since the statistic is unreliable near the end.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    batches = len(values) // MSER_BATCH
+    if batches < 4:
+        return 0
+    means = values[:batches * MSER_BATCH].reshape(batches, MSER_BATCH).mean(axis=1)
+
+    # Sums over the remaining batches for every truncation point, via reversed cumulative sums
+    remaining = np.arange(batches, 0, -1)
+    tail_sum = np.cumsum(means[::-1])[::-1]
+    tail_square_sum = np.cumsum((means ** 2)[::-1])[::-1]
+    tail_variance = (tail_square_sum - tail_sum ** 2 / remaining) / remaining
+    statistic = tail_variance / remaining
+
+    candidates = max(1, int(batches * max_fraction))
+    return int(np.argmin(statistic[:candidates])) * MSER_BATCH
+
+
+def batch_means(values, num_batches=20, confidence=0.95):
+    """Mean, CI half-width and lag-1 correlation of non-overlapping batch means
+
+    Leftover observations at the start are dropped so the batches cover the end
+    of the run. The lag-1 autocorrelation of the batch means is a check that
+    batches are long enough to be treated as independent (it should be near 0).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    batch_size = len(values) // num_batches
+    if num_batches < 2 or batch_size == 0:
+        return {'mean': float(values.mean()) if len(values) else float('nan'),
+                'half_width': float('inf'), 'num_batches': 0, 'batch_size': 0, 'lag1_autocorrelation': float('nan')}
+    means = values[len(values) - num_batches * batch_size:].reshape(num_batches, batch_size).mean(axis=1)
+    centered = means - means.mean()
+    denominator = (centered ** 2).sum()
+    lag1 = float((centered[:-1] * centered[1:]).sum() / denominator) if denominator > 0 else 0.0
+    half_width = t_quantile(0.5 + confidence / 2, num_batches - 1) * means.std(ddof=1) / np.sqrt(num_batches)
+    return {
+        'mean': float(means.mean()),
+        'half_width': float(half_width),
+        'num_batches': num_batches,
+        'batch_size': batch_size,
+        'lag1_autocorrelation': lag1,
+    }
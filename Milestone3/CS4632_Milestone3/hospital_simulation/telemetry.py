@@ -0,0 +1,237 @@
+"""Live progress telemetry for long sweeps
+
+Each simulation run owns a TelemetryReporter that sends its progress (simulated
+time, patients completed, events/sec, ETA) as small JSON datagrams over UDP on
+localhost. The run manager hosts a TelemetryServer that collects them in a
+background thread and serves the sweep's state as JSON over HTTP:
+
+    curl http://127.0.0.1:8765/          # totals, sweep ETA, runs and workers
+    curl http://127.0.0.1:8765/runs      # runs in progress (running or exporting)
+    curl http://127.0.0.1:8765/workers   # latest update per worker process
+
+Enable it in config.json with "telemetry": {"enabled": true}; "port" and
+"interval" (seconds between updates from a run) are optional.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_INTERVAL = 1.0   # Wall-clock seconds between progress updates from a run
+DEFAULT_CHECK_EVERY = 1024  # Events between wall-clock checks
+
+
+class TelemetryReporter:
+    """Sends one run's progress to the sweep's telemetry server
+
+    Datagrams go out on a non-blocking socket and failures are ignored, so a
+    slow or absent server never stalls the simulation; a lost update is simply
+    superseded by the next one. When disabled every hook returns immediately.
+    """
+
+    def __init__(self, options=None, run_id=0, replication=0, horizon=0, purpose=''):
+        options = options or {}
+        address = options.get('address')
+        self.enabled = bool(options.get('enabled', False)) and address is not None
+        self.address = tuple(address) if address else None
+        self.interval = options.get('interval', DEFAULT_INTERVAL)
+        self.check_every = options.get('check_every', DEFAULT_CHECK_EVERY)
+        self.run = {'run_id': run_id, 'replication': replication, 'purpose': purpose,
+                    'worker': os.getpid(), 'horizon': horizon}
+
+        self.events = 0
+        self.countdown = self.check_every
+        self.socket = None
+        self.start_time = self.last_sent = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.start_time = self.last_sent = time.perf_counter()
+        self.send('running', 0, 0)
+
+    def attach(self, env, patients):
+        """Count SimPy steps and report from inside the event loop"""
+        if not self.enabled or not hasattr(env, 'step'):
+            return
+        step = env.step
+        due = self.due
+        send = self.send
+
+        def reporting_step():
+            self.events += 1
+            if due():
+                send('running', env.now, len(patients))
+            step()
+
+        env.step = reporting_step
+
+    def due(self):
+        """True when an update should go out; the clock is read every check_every calls"""
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+        self.countdown = self.check_every
+        now = time.perf_counter()
+        if now - self.last_sent < self.interval:
+            return False
+        self.last_sent = now
+        return True
+
+    def send(self, state, sim_time, patients):
+        elapsed = time.perf_counter() - self.start_time
+        horizon = self.run['horizon']
+        fraction = min(sim_time / horizon, 1.0) if horizon else 0.0
+        message = {
+            **self.run,
+            'state': state,
+            'sim_time': sim_time,
+            'patients': patients,
+            'events': self.events,
+            'elapsed_seconds': elapsed,
+            'events_per_second': self.events / elapsed if elapsed > 0 else 0.0,
+            'eta_seconds': elapsed * (1 - fraction) / fraction if fraction > 0 else None,
+        }
+        try:
+            self.socket.sendto(json.dumps(message).encode(), self.address)
+        except OSError:
+            pass  # Buffer full or nobody listening: drop this update
+
+    def finish(self, sim_time, patients):
+        """Report the end of the simulate phase; the manager marks the run done after its export"""
+        if not self.enabled:
+            return
+        self.send('exporting', sim_time, patients)
+        self.socket.close()
+        self.socket = None
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        snapshot = self.server.telemetry.snapshot()
+        path = self.path.rstrip('/')
+        if path in ('', '/status'):
+            body = snapshot
+        elif path in ('/runs', '/workers'):
+            body = snapshot[path[1:]]
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(body, indent=2).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep polling clients out of the console
+
+
+class TelemetryServer:
+    """Collects reporter datagrams and serves the sweep's state as JSON over localhost HTTP"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.lock = threading.Lock()
+        self.runs = {}       # (run_id, replication) -> latest update until the manager has its result
+        self.workers = {}    # worker pid -> latest update from that worker
+        self.finished = set()
+        self.total_runs = 0
+        self.completed_runs = 0
+        self.start_time = time.perf_counter()
+
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind((host, 0))
+        self.receiver.settimeout(0.5)  # Lets the receiving thread notice stop()
+        self.stopping = threading.Event()
+        self.http = ThreadingHTTPServer((host, port), _StatusHandler)
+        self.http.telemetry = self
+        self.threads = []
+
+    @classmethod
+    def from_config(cls, config):
+        """Server described by config['telemetry'], or None when telemetry is off"""
+        options = config.get('telemetry')
+        if not options or not options.get('enabled', False):
+            return None
+        return cls(options.get('host', DEFAULT_HOST), options.get('port', DEFAULT_PORT))
+
+    @property
+    def address(self):
+        """Where reporters send their datagrams"""
+        return self.receiver.getsockname()
+
+    @property
+    def url(self):
+        host, port = self.http.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        for target in (self._receive, self.http.serve_forever):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.http.shutdown()
+        self.http.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.receiver.close()
+
+    def _receive(self):
+        while not self.stopping.is_set():
+            try:
+                data = self.receiver.recv(65536)
+            except socket.timeout:
+                continue
+            try:
+                update = json.loads(data)
+            except ValueError:
+                continue
+            key = (update['run_id'], update['replication'])
+            with self.lock:
+                self.workers[update['worker']] = update
+                if key not in self.finished:
+                    self.runs[key] = update
+
+    def add_runs(self, count):
+        with self.lock:
+            self.total_runs += count
+
+    def run_completed(self, run_id, replication):
+        """Called by the run manager as results arrive (including cached runs)"""
+        key = (run_id, replication)
+        with self.lock:
+            self.finished.add(key)
+            self.runs.pop(key, None)
+            self.completed_runs += 1
+
+    def snapshot(self):
+        with self.lock:
+            runs = sorted(self.runs.values(), key=lambda update: (update['run_id'], update['replication']))
+            workers = dict(self.workers)
+            total, completed = self.total_runs, self.completed_runs
+
+        # Sweep progress counts running runs by the fraction of their horizon simulated
+        elapsed = time.perf_counter() - self.start_time
+        progress = completed + sum(min(run['sim_time'] / run['horizon'], 1.0) for run in runs if run['horizon'])
+        fraction = progress / total if total else 0.0
+        return {
+            'total_runs': total,
+            'completed_runs': completed,
+            'running_runs': len(runs),
+            'elapsed_seconds': elapsed,
+            'events_per_second': sum(run['events_per_second'] for run in runs if run['state'] == 'running'),
+            'eta_seconds': elapsed * (1 - fraction) / fraction if fraction > 0 else None,
+            'runs': runs,
+            'workers': {str(pid): update for pid, update in workers.items()},
+        }
@@ -0,0 +1,88 @@
+import simpy
+
+
+class TimeWeightedStat:
+    """Exact time integral of a piecewise-constant quantity (busy servers, queue length)
+
+    update() is called only when the value changes; the mean over the run is the
+    accumulated area divided by elapsed time, so nothing depends on a sampling
+    interval. With `series_interval` set it also keeps per-interval averages for
+    plotting.
+    """
+    __slots__ = ('start_time', 'last_time', 'value', 'area', 'max', 'min',
+                 'series_interval', 'series', 'bin_start', 'bin_area')
+
+    def __init__(self, start_time=0.0, value=0, series_interval=None):
+        self.start_time = start_time
+        self.last_time = start_time
+        self.value = value
+        self.area = 0.0
+        self.max = value
+        self.min = value
+        self.series_interval = series_interval
+        self.series = [] if series_interval else None  # (interval start, average value) pairs
+        self.bin_start = start_time
+        self.bin_area = 0.0
+
+    def update(self, time, value):
+        """Close the segment at the old value and switch to the new one"""
+        if self.series is not None:
+            self._fill_series(time)
+        self.area += self.value * (time - self.last_time)
+        self.last_time = time
+        self.value = value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    def _fill_series(self, time):
+        interval = self.series_interval
+        segment_start = self.last_time
+        bin_end = self.bin_start + interval
+        while time >= bin_end:
+            self.bin_area += self.value * (bin_end - segment_start)
+            self.series.append((self.bin_start, self.bin_area / interval))
+            self.bin_start = segment_start = bin_end
+            self.bin_area = 0.0
+            bin_end += interval
+        self.bin_area += self.value * (time - segment_start)
+
+    def mean(self, now):
+        """Time-average value from start_time to now"""
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return self.value
+        return (self.area + self.value * (now - self.last_time)) / elapsed
+
+    def finalize(self, now):
+        """Bring the integral (and series) up to now without changing the value"""
+        self.update(now, self.value)
+
+
+class MonitoredResource(simpy.Resource):
+    """simpy.Resource that tracks busy servers and queue length as time integrals
+
+    SimPy changes users and put_queue only inside _trigger_put/_trigger_get, so
+    hooking those two methods catches every request and release.
+    """
+
+    def __init__(self, env, capacity=1, series_interval=None):
+        super().__init__(env, capacity=capacity)
+        self.busy = TimeWeightedStat(env.now, 0, series_interval)
+        self.queue_length = TimeWeightedStat(env.now, 0, series_interval)
+
+    def _record(self):
+        now = self._env.now
+        if len(self.users) != self.busy.value:
+            self.busy.update(now, len(self.users))
+        if len(self.put_queue) != self.queue_length.value:
+            self.queue_length.update(now, len(self.put_queue))
+
+    def _trigger_put(self, get_event):
+        super()._trigger_put(get_event)
+        self._record()
+
+    def _trigger_get(self, put_event):
+        super()._trigger_get(put_event)
+        self._record()
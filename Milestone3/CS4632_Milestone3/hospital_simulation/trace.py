@@ -0,0 +1,162 @@
+"""Trace-driven arrivals: replay recorded ED arrivals instead of sampling them
+
+config['trace'] = {"path": "arrivals.csv"} takes the arrival times and triage
+levels from a trace file instead of sampling them. Service times are also taken
+from the trace when it has them. The columns are:
+
+    arrival_time    minutes from the start of the trace, or
+    timestamp       date/time strings, converted to minutes since "origin"
+                    (default: the first timestamp in the file)
+    triage_level    acuity 1-5 (also accepted as "acuity")
+    triage_time     optional, minutes; missing values are sampled
+    treatment_time  optional, minutes; missing values are sampled
+
+CSV traces are read with pandas, "chunk_rows" rows at a time. .npy traces are
+memory-mapped. Either way, only the chunk being replayed is held in memory,
+and nothing past the run's horizon is read. "start" (minutes) replays from
+later in the trace; that point becomes time 0 of the run.
+
+Convert a CSV trace once for faster replay:
+    python -m hospital_simulation.trace convert arrivals.csv arrivals.npy
+"""
+import argparse
+import math
+from pathlib import Path
+
+import numpy as np
+
+TRACE_DTYPE = np.dtype([('arrival_time', 'f8'), ('triage_level', 'i1'),
+                        ('triage_time', 'f8'), ('treatment_time', 'f8')])
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def trace_signature(options):
+    """Size and modification time of a trace file, so the result cache notices a replaced trace"""
+    stat = Path(options['path']).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _csv_chunks(path, chunk_rows, origin=None):
+    """Structured TRACE_DTYPE chunks parsed from a CSV trace"""
+    import pandas as pd
+    if origin is not None:
+        origin = pd.Timestamp(origin)
+    for frame in pd.read_csv(path, chunksize=chunk_rows):
+        frame = frame.rename(columns={'acuity': 'triage_level'})
+        chunk = np.empty(len(frame), dtype=TRACE_DTYPE)
+        if 'arrival_time' in frame:
+            chunk['arrival_time'] = frame['arrival_time'].to_numpy(np.float64)
+        else:
+            stamps = pd.to_datetime(frame['timestamp'])
+            if origin is None and len(stamps):
+                origin = stamps.iloc[0]
+            chunk['arrival_time'] = ((stamps - origin) / pd.Timedelta(minutes=1)).to_numpy(np.float64)
+        chunk['triage_level'] = frame['triage_level'].to_numpy()
+        for column in ('triage_time', 'treatment_time'):
+            chunk[column] = frame[column].to_numpy(np.float64) if column in frame else np.nan
+        yield chunk
+
+
+def _npy_chunks(path, chunk_rows, start=0.0):
+    """Slices of a memory-mapped .npy trace, from the first arrival at or after `start`"""
+    data = np.load(path, mmap_mode='r')
+    if data.dtype != TRACE_DTYPE:
+        raise ValueError(f"{path}: expected a trace written by 'python -m hospital_simulation.trace convert'")
+    # Binary search only touches a few pages of the mapping
+    first = int(np.searchsorted(data['arrival_time'], start)) if start else 0
+    for offset in range(first, len(data), chunk_rows):
+        yield data[offset:offset + chunk_rows]
+
+
+def read_trace(path, chunk_rows=DEFAULT_CHUNK_ROWS, start=0.0, origin=None):
+    """Validated trace chunks in arrival order, from `start` on"""
+    path = Path(path)
+    if path.suffix == '.npy':
+        chunks = _npy_chunks(path, chunk_rows, start)
+    else:
+        chunks = _csv_chunks(path, chunk_rows, origin)
+    previous = -math.inf
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        times = chunk['arrival_time']
+        if times[0] < previous or np.any(times[1:] < times[:-1]):
+            raise ValueError(f"{path}: arrival times must not decrease")
+        levels = chunk['triage_level']
+        if np.any((levels < 1) | (levels > 5)):
+            raise ValueError(f"{path}: triage levels must be between 1 and 5")
+        previous = times[-1]
+        if start and times[0] < start:
+            chunk = chunk[np.searchsorted(times, start):]
+        yield chunk
+
+
+class TraceStreams:
+    """Same interface as RandomStreams, replaying a trace's arrivals
+
+    Each interarrival() call moves on to the next recorded patient, whose
+    triage level and service times the following calls return. `streams`
+    (ordinary random streams) fill in service times the trace does not have.
+    Once the trace runs out, no more patients arrive.
+    """
+
+    def __init__(self, options, streams):
+        self.options = options
+        self.streams = streams
+        self.records = self._records()
+        self.record = None
+        self.time = 0.0
+
+    def _records(self):
+        start = self.options.get('start', 0.0)
+        for chunk in read_trace(self.options['path'], self.options.get('chunk_rows', DEFAULT_CHUNK_ROWS),
+                                start, self.options.get('origin')):
+            # Plain Python lists make per-patient access as cheap as the block random streams
+            yield from zip((chunk['arrival_time'] - start).tolist(), chunk['triage_level'].tolist(),
+                           chunk['triage_time'].tolist(), chunk['treatment_time'].tolist())
+
+    def interarrival(self):
+        self.record = next(self.records, None)
+        if self.record is None:
+            return math.inf
+        gap = self.record[0] - self.time
+        self.time = self.record[0]
+        return gap
+
+    def triage_level(self):
+        return self.record[1]
+
+    def triage_time(self):
+        duration = self.record[2]
+        return self.streams.triage_time() if math.isnan(duration) else duration
+
+    def treatment_time(self):
+        duration = self.record[3]
+        return self.streams.treatment_time() if math.isnan(duration) else duration
+
+
+def convert(source, target, chunk_rows=DEFAULT_CHUNK_ROWS, origin=None):
+    """Write a CSV trace as a memory-mappable .npy file, streaming in two passes; returns the row count"""
+    rows = sum(len(chunk) for chunk in read_trace(source, chunk_rows, origin=origin))
+    output = np.lib.format.open_memmap(target, mode='w+', dtype=TRACE_DTYPE, shape=(rows,))
+    offset = 0
+    for chunk in read_trace(source, chunk_rows, origin=origin):
+        output[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    output.flush()
+    del output
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prepare arrival traces for trace-driven runs")
+    parser.add_argument('command', choices=['convert'])
+    parser.add_argument('source', help="CSV trace")
+    parser.add_argument('target', help=".npy file to write")
+    parser.add_argument('--origin', help="timestamp that becomes minute 0 (default: the first arrival)")
+    args = parser.parse_args(argv)
+    print(f"Wrote {convert(args.source, args.target, origin=args.origin):,} arrivals to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,99 @@
-import pandas as pd
+from collections import deque
+
+from hospital_simulation.time_weighted import TimeWeightedStat
+
+TRIAGE_LEVELS = (1, 2, 3, 4, 5)
+QUEUE_HISTORY_COLUMNS = ['time', 'queue_1_length', 'queue_2_length', 'queue_3_length',
+                         'queue_4_length', 'queue_5_length', 'total_queue_length']
+
 
 class WaitingQueue:
-    def __init__(self):
-        self.queues = {1: [], 2: [], 3: [], 4: [], 5: []}  # Priority levels 1-5
-        self.queue_history = []
+    def __init__(self, verbose=True, record_history=True, start_time=0.0):
+        self.queues = {level: deque() for level in TRIAGE_LEVELS}  # Priority levels 1-5
+        self.total_length = 0
+        self.queue_history = []  # One (time, level 1..5 lengths, total) row per change
+        self.record_history = record_history
+        self.verbose = verbose
+
+        # Exact time-average queue lengths, updated whenever a length changes
+        self.length_stats = {level: TimeWeightedStat(start_time) for level in TRIAGE_LEVELS}
+        self.total_length_stat = TimeWeightedStat(start_time)
+
+    def __len__(self):
+        return self.total_length
 
     def add_patient(self, patient, current_time=None):
         """Add patient to appropriate queue"""
-        self.queues[patient.triage_level].append(patient)
-        print(f"Patient {patient.patient_id} added to queue level {patient.triage_level}")
+        level = patient.triage_level
+        self.queues[level].append(patient)
+        self.total_length += 1
+        if self.verbose:
+            print(f"Patient {patient.patient_id} added to queue level {level}")
 
         # Record queue state if current_time is provided
         if current_time is not None:
-            self.record_queue_state(current_time)
+            self.update_length_stats(level, current_time)
+            if self.record_history:
+                self.record_queue_state(current_time)
 
     def get_next_patient(self, current_time=None):
         """Get next patient based on priority"""
-        for level in range(1, 6):
-            if self.queues[level]:
-                patient = self.queues[level].pop(0)
-                print(f"Patient {patient.patient_id} retrieved from queue level {level}")
+        if not self.total_length:
+            return None
+        for level in TRIAGE_LEVELS:
+            queue = self.queues[level]
+            if queue:
+                patient = queue.popleft()
+                self.total_length -= 1
+                if self.verbose:
+                    print(f"Patient {patient.patient_id} retrieved from queue level {level}")
 
                 # Record queue state if current_time is provided
                 if current_time is not None:
-                    self.record_queue_state(current_time)
+                    self.update_length_stats(level, current_time)
+                    if self.record_history:
+                        self.record_queue_state(current_time)
                 return patient
         return None
 
+    def remove(self, patient, current_time=None):
+        """Take out a given patient, e.g. the one a FIFO doctor pool just granted"""
+        level = patient.triage_level
+        queue = self.queues[level]
+        # Within a level the FIFO pool grants in arrival order, so this is almost always the head
+        if queue[0] is patient:
+            queue.popleft()
+        else:
+            queue.remove(patient)
+        self.total_length -= 1
+        if self.verbose:
+            print(f"Patient {patient.patient_id} removed from queue level {level}")
+
+        if current_time is not None:
+            self.update_length_stats(level, current_time)
+            if self.record_history:
+                self.record_queue_state(current_time)
+
+    def update_length_stats(self, level, current_time):
+        """Fold the length change of one level into the time-weighted statistics"""
+        self.length_stats[level].update(current_time, len(self.queues[level]))
+        self.total_length_stat.update(current_time, self.total_length)
+
+    def finalize_stats(self, current_time):
+        """Extend the time-weighted statistics to the end of the run"""
+        for stat in self.length_stats.values():
+            stat.finalize(current_time)
+        self.total_length_stat.finalize(current_time)
+
     def record_queue_state(self, current_time):
         """Record current state of all queues"""
-        queue_state = {
-            'time': current_time,
-            'queue_1_length': len(self.queues[1]),
-            'queue_2_length': len(self.queues[2]),
-            'queue_3_length': len(self.queues[3]),
-            'queue_4_length': len(self.queues[4]),
-            'queue_5_length': len(self.queues[5]),
-            'total_queue_length': sum(len(q) for q in self.queues.values())
-        }
-        self.queue_history.append(queue_state)
+        queues = self.queues
+        self.queue_history.append((current_time, len(queues[1]), len(queues[2]), len(queues[3]),
+                                   len(queues[4]), len(queues[5]), self.total_length))
 
     def export_queue_data(self, filename):
         """Export queue history to CSV"""
         if self.queue_history:
-            df = pd.DataFrame(self.queue_history)
-            df.to_csv(filename, index=False)
\ No newline at end of file
+            import pandas as pd
+            df = pd.DataFrame(self.queue_history, columns=QUEUE_HISTORY_COLUMNS)
+            df.to_csv(filename, index=False)
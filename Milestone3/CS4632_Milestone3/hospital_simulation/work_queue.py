@@ -0,0 +1,214 @@
+"""Durable SQLite work queue for resumable, sharded sweeps
+
+A sweep's runs are enqueued once, in shards of consecutive runs. Any number
+of worker processes, on this machine or on others sharing the filesystem,
+claim whole shards and commit each run's metrics as soon as it finishes, so
+an interrupted sweep loses at most the runs that were in progress. A claim is
+a lease: each finished run renews it, and shards whose lease runs out (their
+worker died) become claimable again. Re-enqueueing the same sweep is a no-op,
+which is how a sweep resumes; a run whose config changed since it was queued
+(compared by hash) is reset and runs again with the new config.
+
+SQLite locking needs a filesystem with working POSIX locks; most NFS setups
+qualify, but avoid queues on SMB shares or sync folders.
+
+Command line (from the project folder):
+    python -m hospital_simulation.work_queue status        --queue PATH
+    python -m hospital_simulation.work_queue retry-failed  --queue PATH
+    python -m hospital_simulation.work_queue release       --queue PATH   # only when no worker is alive
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from hospital_simulation.result_cache import NON_RESULT_KEYS
+
+DEFAULT_PATH = 'simulation_runs_m3/work_queue.sqlite'
+DEFAULT_SHARD_SIZE = 10
+DEFAULT_LEASE_SECONDS = 1800
+STATUSES = ('pending', 'claimed', 'done', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER NOT NULL,
+    replication INTEGER NOT NULL,
+    shard INTEGER NOT NULL,
+    config TEXT NOT NULL,
+    config_hash TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    metrics TEXT,
+    error TEXT,
+    PRIMARY KEY (run_id, replication)
+);
+CREATE INDEX IF NOT EXISTS runs_by_shard ON runs (shard, status);
+"""
+
+
+def config_hash(config):
+    """Hash of a run's result-relevant config, to notice runs whose config changed"""
+    relevant = {key: value for key, value in config.items() if key not in NON_RESULT_KEYS}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def worker_name():
+    """Identifies a claimant across machines: host and process id"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path=DEFAULT_PATH, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; writes that must be atomic open their own transaction
+        self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.db.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config):
+        """Queue described by config['work_queue'], or None when sweeps run in memory"""
+        options = config.get('work_queue')
+        if not options:
+            return None
+        return cls(options.get('path', DEFAULT_PATH), options.get('lease_seconds', DEFAULT_LEASE_SECONDS))
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front, so claims cannot interleave"""
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+
+    def enqueue(self, run_configs, shard_size=DEFAULT_SHARD_SIZE):
+        """Add runs not already queued and reset queued runs whose config changed; returns (added, reset)"""
+        added = reset = 0
+        with self._transaction() as db:
+            first_shard = db.execute('SELECT COALESCE(MAX(shard) + 1, 0) FROM runs').fetchone()[0]
+            for config in run_configs:
+                key = (config['run_id'], config.get('replication', 0))
+                digest = config_hash(config)
+                serialized = json.dumps(config, default=str)
+                cursor = db.execute(
+                    'INSERT OR IGNORE INTO runs (run_id, replication, shard, config, config_hash) '
+                    'VALUES (?, ?, ?, ?, ?)', (*key, first_shard + added // shard_size, serialized, digest))
+                if cursor.rowcount:
+                    added += 1
+                    continue
+                # Queued under another config: drop its result and run it again
+                reset += db.execute(
+                    "UPDATE runs SET config = ?, config_hash = ?, status = 'pending', worker = NULL, "
+                    "claimed_at = NULL, attempts = 0, metrics = NULL, error = NULL "
+                    "WHERE run_id = ? AND replication = ? AND config_hash IS NOT ?",
+                    (serialized, digest, *key, digest)).rowcount
+        return added, reset
+
+    def claim_shard(self, worker):
+        """Claim the next pending (or abandoned) shard; returns its run configs, or [] when none is left"""
+        now = time.time()
+        claimable = "(status = 'pending' OR (status = 'claimed' AND claimed_at < ?))"
+        with self._transaction() as db:
+            row = db.execute(f"SELECT shard FROM runs WHERE {claimable} ORDER BY shard LIMIT 1",
+                             (now - self.lease_seconds,)).fetchone()
+            if row is None:
+                return []
+            db.execute("UPDATE runs SET status = 'claimed', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                       f"WHERE shard = ? AND {claimable}", (worker, now, row[0], now - self.lease_seconds))
+            configs = db.execute("SELECT config FROM runs WHERE shard = ? AND worker = ? AND status = 'claimed' "
+                                 "ORDER BY run_id, replication", (row[0], worker)).fetchall()
+        return [json.loads(config) for config, in configs]
+
+    def complete(self, config, metrics, worker):
+        """Commit one finished run and renew the lease on the rest of its shard
+
+        A result for a config that has since been replaced is dropped.
+        """
+        with self._transaction() as db:
+            db.execute("UPDATE runs SET status = 'done', worker = ?, metrics = ?, error = NULL "
+                       "WHERE run_id = ? AND replication = ? AND config_hash = ?",
+                       (worker, json.dumps(metrics, default=float), config['run_id'], config.get('replication', 0),
+                        config_hash(config)))
+            db.execute("UPDATE runs SET claimed_at = ? WHERE worker = ? AND status = 'claimed'", (time.time(), worker))
+
+    def fail(self, config, error, worker):
+        """Record a run that raised; it stays failed until retry_failed()"""
+        self.db.execute(
+            "UPDATE runs SET status = 'failed', worker = ?, error = ? "
+            "WHERE run_id = ? AND replication = ? AND config_hash = ?",
+            (worker, error, config['run_id'], config.get('replication', 0), config_hash(config)))
+
+    def release(self, worker=None):
+        """Return claimed runs (one worker's, or everyone's) to the queue; returns how many"""
+        if worker is None:
+            return self.db.execute("UPDATE runs SET status = 'pending' WHERE status = 'claimed'").rowcount
+        return self.db.execute("UPDATE runs SET status = 'pending' WHERE status = 'claimed' AND worker = ?",
+                               (worker,)).rowcount
+
+    def retry_failed(self):
+        """Put failed runs back in the queue; returns how many"""
+        return self.db.execute("UPDATE runs SET status = 'pending', error = NULL WHERE status = 'failed'").rowcount
+
+    def results(self, keys=None):
+        """Metrics of finished runs, in (run_id, replication) order
+
+        keys, a collection of (run_id, replication) pairs, limits them to one
+        sweep's runs; a queue reused across sweeps keeps the earlier sweeps' rows.
+        """
+        rows = self.db.execute(
+            "SELECT run_id, replication, metrics FROM runs WHERE status = 'done' "
+            "ORDER BY run_id, replication").fetchall()
+        if keys is not None:
+            keys = set(keys)
+            rows = [row for row in rows if (row[0], row[1]) in keys]
+        return [json.loads(metrics) for _, _, metrics in rows]
+
+    def status(self):
+        """Number of runs in each state, plus failures with their errors"""
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self.db.execute('SELECT status, COUNT(*) FROM runs GROUP BY status').fetchall())
+        counts['failures'] = self.db.execute(
+            "SELECT run_id, replication, worker, error FROM runs WHERE status = 'failed'").fetchall()
+        return counts
+
+    def unfinished(self):
+        """Runs still pending or claimed"""
+        return self.db.execute("SELECT COUNT(*) FROM runs WHERE status IN ('pending', 'claimed')").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or reset a sweep work queue")
+    parser.add_argument('command', choices=['status', 'retry-failed', 'release'])
+    parser.add_argument('--queue', default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.queue)
+    if args.command == 'retry-failed':
+        print(f"Requeued {queue.retry_failed()} failed runs in {queue.path}")
+    elif args.command == 'release':
+        print(f"Released {queue.release()} claimed runs in {queue.path}")
+    else:
+        status = queue.status()
+        for name in STATUSES:
+            print(f"{name}: {status[name]}")
+        for run_id, replication, worker, error in status['failures']:
+            print(f"  run {run_id} replication {replication} on {worker}: {error}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
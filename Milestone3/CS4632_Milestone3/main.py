@@ -14,7 +14,14 @@ def main():
 
     manager = SimulationRunManager(config)
     manager.generate_run_configurations()
-    manager.execute_all_runs()
+    if config.get('staffing_search'):
+        manager.optimize_staffing()
+    elif config.get('adaptive_replications'):
+        manager.execute_adaptive_runs()
+    elif config.get('work_queue'):
+        manager.execute_queued_runs()
+    else:
+        manager.execute_all_runs()
 
     print("\n🎉 Simulation completed! Check 'simulation_runs_m3' folder for results")
 
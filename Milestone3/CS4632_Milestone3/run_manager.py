@@ -1,6 +1,105 @@
+import argparse
 import json
-import pandas as pd
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from pathlib import Path
+
+from hospital_simulation.confidence import confidence_interval, paired_difference
+from hospital_simulation.engines import create_simulation
+from hospital_simulation.enhanced_simulation import run_directory_name
+from hospital_simulation.lockstep import run_lockstep
+from hospital_simulation.prescreen import PRESCREEN_DEFAULTS, screen
+from hospital_simulation.result_cache import ResultCache
+from hospital_simulation.result_store import ResultStore
+from hospital_simulation.staffing import STAFFING_DEFAULTS, StaffingSearch
+from hospital_simulation.telemetry import TelemetryServer
+from hospital_simulation.work_queue import (DEFAULT_LEASE_SECONDS, DEFAULT_PATH, DEFAULT_SHARD_SIZE, WorkQueue,
+                                            worker_name)
+
+
+# Run options passed from the base config (config.json) into every generated scenario
+RUN_OPTION_KEYS = ('engine', 'metrics_mode', 'utilization_mode', 'random_streams', 'record_events',
+                   'record_queue_history', 'compact_patients', 'instrumentation', 'result_cache',
+                   'result_store', 'telemetry', 'verbosity', 'network', 'arrival_schedule', 'arrival_batch',
+                   'common_random_numbers', 'antithetic', 'trace')
+
+# Metrics compared against the baseline scenario when variance reduction is on
+PAIRED_TARGETS = ['avg_total_time', 'avg_wait_for_treatment', 'avg_doctor_utilization']
+
+
+# Defaults for execute_adaptive_runs, overridable through base_config['adaptive_replications']
+ADAPTIVE_DEFAULTS = {
+    'targets': ['avg_total_time'] + [f"level_{level}_avg_wait_for_treatment" for level in range(1, 6)],
+    'tolerance': 1.0,        # CI half-width to reach, in minutes (or a fraction of the mean if relative)
+    'relative': False,
+    'confidence': 0.95,
+    'min_replications': 5,
+    'max_replications': 200,
+}
+
+# Seconds between checks while other workers still hold claims on a queued sweep
+QUEUE_POLL_SECONDS = 10
+
+
+def execute_run(config):
+    """Run a single simulation; top-level so worker processes can pickle it"""
+    # Reuse a cached result of the identical run (same config, seed, replication and code)
+    cache = ResultCache.from_config(config)
+    run_dir = Path(config.get('output_directory', 'simulation_runs')) / run_directory_name(config, config['run_id'])
+    metrics = cache.load(config, run_dir) if cache is not None else None
+
+    if metrics is None:
+        simulation = create_simulation(dict(config))
+        metrics = simulation.run(config['run_id'])
+        if cache is not None:
+            tables = simulation.result_tables() if config.get('result_store') else None
+            cache.store(config, metrics, run_dir, tables)
+    else:
+        metrics['cached'] = True
+        store = ResultStore.from_config(config)
+        if store is not None:
+            for table, columns in cache.load_tables(config).items():
+                store.write(table, columns, config['run_id'], config.get('replication', 0))
+
+    # Add run information to metrics
+    metrics['purpose'] = config['purpose']
+    metrics['arrival_rate'] = config['arrival_rate']
+    metrics['num_doctors'] = config['num_doctors']
+    metrics['num_triage_nurses'] = config['num_triage_nurses']
+    metrics['treatment_rate'] = config['treatment_rate']
+    return metrics
+
+
+def run_queue_worker(queue_path, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claim shards from a sweep's work queue until none is left; returns the runs completed
+
+    Each run's metrics are committed as soon as it finishes. If the worker is
+    interrupted, its unfinished claims go straight back to the queue.
+    """
+    queue = WorkQueue(queue_path, lease_seconds)
+    worker = worker_name()
+    completed = 0
+    try:
+        while True:
+            configs = queue.claim_shard(worker)
+            if not configs:
+                return completed
+            for config in configs:
+                try:
+                    metrics = execute_run(config)
+                except Exception as error:
+                    queue.fail(config, repr(error), worker)
+                    continue
+                queue.complete(config, metrics, worker)
+                completed += 1
+    finally:
+        queue.release(worker)
+        queue.close()
+
 
 class SimulationRunManager:
     def __init__(self, base_config):
@@ -8,6 +107,21 @@ class SimulationRunManager:
         self.all_metrics = []
         self.run_configs = []
 
+        # Replications per scenario and worker processes used to execute them
+        self.num_replications = base_config.get('num_replications', 1)
+        self.num_workers = base_config.get('num_workers', 1)
+
+        # Console detail (0 silent, 1 per run) and the live telemetry server while a sweep runs
+        self.verbosity = base_config.get('verbosity', 1)
+        self.telemetry = None
+
+        # Common random numbers / antithetic pairs make scenario comparisons paired
+        self.variance_reduction = bool(base_config.get('common_random_numbers') or base_config.get('antithetic'))
+
+        # Analytic pre-screen rows and the scenarios it dropped
+        self.prescreen = []
+        self.skipped_configs = []
+
     def generate_run_configurations(self):
         """Generate 10 different configuration sets for testing"""
         base_params = {
@@ -21,6 +135,7 @@ class SimulationRunManager:
             'data_collection_interval': 5,
             'output_directory': 'simulation_runs_m3'
         }
+        base_params.update({key: self.base_config[key] for key in RUN_OPTION_KEYS if key in self.base_config})
 
         # Define 10 different scenarios
         self.run_configs = [
@@ -38,48 +153,440 @@ class SimulationRunManager:
 
         return self.run_configs
 
-    def execute_all_runs(self):
-        """Execute all simulation runs"""
-        print("Starting all simulation runs...")
+    def expand_replications(self):
+        """List one config per (scenario, replication) pair"""
+        return [
+            {**config, 'replication': replication, 'num_replications': self.num_replications}
+            for config in self.run_configs
+            for replication in range(self.num_replications)
+        ]
+
+    def prescreen_runs(self):
+        """Check every scenario against the analytic queueing approximation before simulating it
+
+        Unstable scenarios (a stage loaded at or beyond capacity) and near-unstable
+        or overstaffed ones are flagged in prescreen.csv and all_runs_summary.csv.
+        Unstable ones are only dropped when skip_unstable is set, as a finite shift
+        loaded past capacity is still a valid scenario. With adjust_horizons, each
+        remaining scenario runs for a horizon sized from its relaxation time
+        instead of simulation_time. Network and trace-driven scenarios are not
+        screened.
+        """
+        settings = {**PRESCREEN_DEFAULTS, **self.base_config.get('prescreen', {})}
+        screened = [config for config in self.run_configs if not config.get('network') and not config.get('trace')]
+        if not settings['enabled'] or not screened:
+            return []
+
+        self.prescreen = screen(screened, settings)
+        skipped = set()
+        for config, row in zip(screened, self.prescreen):
+            if row['flag'] == 'unstable' and settings['skip_unstable']:
+                skipped.add(config['run_id'])
+                row['flag'] = 'unstable (skipped)'
+            elif settings['adjust_horizons']:
+                config['simulation_time'] = row['suggested_horizon']
+        self.skipped_configs = [config for config in self.run_configs if config['run_id'] in skipped]
+        self.run_configs = [config for config in self.run_configs if config['run_id'] not in skipped]
+
+        import pandas as pd
+        prescreen_df = pd.DataFrame(self.prescreen)
+        output_directory = Path(self.base_config.get('output_directory', 'simulation_runs_m3'))
+        output_directory.mkdir(parents=True, exist_ok=True)
+        prescreen_df.to_csv(output_directory / 'prescreen.csv', index=False)
+
+        flagged = prescreen_df[prescreen_df['flag'] != '']
+        if self.verbosity >= 1 and not flagged.empty:
+            print("Analytic pre-screen (steady-state M/M/c approximation):")
+            print(flagged[['run_id', 'purpose', 'flag', 'triage_utilization', 'doctor_utilization']]
+                  .to_string(index=False))
+            for config in self.skipped_configs:
+                print(f"Skipping unstable scenario {config['run_id']}: {config['purpose']}")
+            print("-" * 40)
+        return self.prescreen
+
+    def _resolve_workers(self, num_workers):
+        num_workers = num_workers or self.num_workers
+        if num_workers == 'auto':
+            num_workers = os.cpu_count() or 1
+        return num_workers
+
+    @staticmethod
+    def _executor(num_workers):
+        """Process pool for more than one worker, otherwise run in this process"""
+        if num_workers > 1:
+            return ProcessPoolExecutor(max_workers=num_workers)
+        return nullcontext()
+
+    def _map_runs(self, executor, run_configs, num_workers):
+        """Execute runs and return their metrics in the order of run_configs
+
+        Every run is seeded from (base seed, run_id, replication), so results come
+        back identical whatever the worker count.
+        """
+        if self.telemetry is not None:
+            # Point every run's reporter at this sweep's server
+            self.telemetry.add_runs(len(run_configs))
+            address = self.telemetry.address
+            run_configs = [{**config, 'telemetry': {**config.get('telemetry', {}), 'address': address}}
+                           for config in run_configs]
+        if executor is None:
+            return map(execute_run, run_configs)
+        return executor.map(execute_run, run_configs, chunksize=self._chunksize(len(run_configs), num_workers))
+
+    @contextmanager
+    def _serve_telemetry(self):
+        """Serve live progress over localhost HTTP for the length of a sweep, when enabled"""
+        server = TelemetryServer.from_config(self.base_config)
+        if server is None:
+            yield
+            return
+        self.telemetry = server.start()
+        print(f"Live telemetry at {server.url}")
+        try:
+            yield
+        finally:
+            server.stop()
+            self.telemetry = None
+
+    def execute_all_runs(self, num_workers=None):
+        """Execute all simulation runs, in a process pool when more than one worker is set"""
+        num_workers = self._resolve_workers(num_workers)
+        self.prescreen_runs()
+        run_configs = self.expand_replications()
+        print(f"Starting {len(run_configs)} simulation runs on {num_workers} worker(s)...")
+        print("=" * 60)
+
+        with self._serve_telemetry(), self._executor(num_workers) as executor:
+            self._collect_results(self._map_runs(executor, run_configs, num_workers))
+        self.enforce_cache_limit()
+
+        # Export summary of all runs
+        self.export_summary()
+        if self.variance_reduction:
+            self.export_paired_differences()
+
+    def execute_adaptive_runs(self, num_workers=None, **settings):
+        """Replicate each scenario until its target metrics' CIs are narrow enough
+
+        After min_replications, a scenario keeps receiving batches of
+        replications (sized from its current half-width) until every target's
+        confidence-interval half-width is within tolerance, or max_replications
+        is reached. Converged scenarios stop consuming compute while the noisy
+        ones continue.
+        """
+        settings = {**ADAPTIVE_DEFAULTS, **self.base_config.get('adaptive_replications', {}), **settings}
+        num_workers = self._resolve_workers(num_workers)
+        self.prescreen_runs()
+        print(f"Starting adaptive replications for {len(self.run_configs)} scenarios on {num_workers} worker(s)...")
+        print("=" * 60)
+
+        results = {config['run_id']: [] for config in self.run_configs}
+        configs = {config['run_id']: config for config in self.run_configs}
+        pending = {run_id: settings['min_replications'] for run_id in results}
+        self.convergence = {}
+
+        with self._serve_telemetry(), self._executor(num_workers) as executor:
+            while pending:
+                batch = [
+                    {**configs[run_id], 'replication': len(results[run_id]) + offset,
+                     'num_replications': settings['max_replications']}
+                    for run_id, count in pending.items() for offset in range(count)
+                ]
+                for metrics in self._map_runs(executor, batch, num_workers):
+                    results[metrics['run_id']].append(metrics)
+                    self._collect_results([metrics])
+
+                pending = {}
+                for run_id, runs in results.items():
+                    status = self.replication_status(runs, settings)
+                    self.convergence[run_id] = status
+                    if not status['converged'] and len(runs) < settings['max_replications']:
+                        pending[run_id] = self._next_batch_size(len(runs), status, settings)
+
+        self.enforce_cache_limit()
+        self.export_summary()
+        self.export_replication_summary()
+
+    def optimize_staffing(self, num_workers=None, **settings):
+        """Search for the cheapest (num_triage_nurses, num_doctors) meeting the wait-time constraints
+
+        The other parameters come from the baseline scenario. Candidates are
+        replicated in doubling stages and dropped as soon as they are shown
+        feasible, infeasible or dominated by a cheaper feasible one (see
+        hospital_simulation.staffing). Returns the search.
+        """
+        settings = {**STAFFING_DEFAULTS, **self.base_config.get('staffing_search', {}), **settings}
+        num_workers = self._resolve_workers(num_workers)
+        search = StaffingSearch(settings)
+        baseline = (self.run_configs or self.generate_run_configurations())[0]
+        print(f"Searching {len(search.candidates)} staffing levels on {num_workers} worker(s)...")
+        print("=" * 60)
+
+        self.run_configs = [
+            {**baseline, 'run_id': candidate.run_id, 'purpose': candidate.label,
+             'num_triage_nurses': candidate.nurses, 'num_doctors': candidate.doctors,
+             'common_random_numbers': settings['common_random_numbers']}
+            for candidate in search.candidates
+        ]
+
+        with self._serve_telemetry(), self._executor(num_workers) as executor:
+            while not search.finished():
+                batch = [
+                    {**self.run_configs[candidate.run_id - 1], 'replication': replication,
+                     'num_replications': settings['max_replications']}
+                    for candidate, replication in search.next_batch()
+                ]
+                for metrics in self._map_runs(executor, batch, num_workers):
+                    search.candidates[metrics['run_id'] - 1].runs.append(metrics)
+                    self._collect_results([metrics])
+                search.update()
+
+        self.enforce_cache_limit()
+        self.export_summary()
+
+        import pandas as pd
+        search_df = pd.DataFrame(search.table())
+        search_df.to_csv('simulation_runs_m3/staffing_search.csv', index=False)
+
+        print("\n" + "=" * 60)
+        print(f"STAFFING SEARCH ({search.simulated_runs()} runs, "
+              f"{len(search.candidates) * settings['max_replications']} for the full grid)")
+        print("=" * 60)
+        print(search_df[['num_triage_nurses', 'num_doctors', 'cost', 'replications', 'status']].to_string(index=False))
+        print(search.statement())
+        return search
+
+    def execute_queued_runs(self, num_workers=None):
+        """Execute all runs through a durable work queue, so an interrupted sweep can resume
+
+        Runs are enqueued in shards (already queued runs are kept as they are),
+        local workers drain the queue alongside any other workers joined with
+        `python run_manager.py --queue PATH --join`, and the summary is built from
+        this sweep's committed results once no run is left pending or claimed.
+        """
+        options = self.base_config.get('work_queue') or {}
+        path = options.get('path', DEFAULT_PATH)
+        lease_seconds = options.get('lease_seconds', DEFAULT_LEASE_SECONDS)
+        num_workers = self._resolve_workers(num_workers)
+        self.prescreen_runs()
+
+        run_configs = self.expand_replications()
+        queue = WorkQueue(path, lease_seconds)
+        added, reset = queue.enqueue(run_configs, options.get('shard_size', DEFAULT_SHARD_SIZE))
+        print(f"Work queue {path}: {added} new runs, {reset} reset after a config change, "
+              f"{queue.unfinished()} left to run on {num_workers} worker(s)...")
+        print("=" * 60)
+
+        while True:
+            if num_workers > 1:
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    list(executor.map(run_queue_worker, [path] * num_workers, [lease_seconds] * num_workers))
+            else:
+                run_queue_worker(path, lease_seconds)
+            if not queue.unfinished():
+                break
+            # Other workers still hold claims; their shards come back here if their lease runs out
+            time.sleep(QUEUE_POLL_SECONDS)
+
+        status = queue.status()
+        for run_id, replication, worker, error in status['failures']:
+            print(f"Run {run_id} replication {replication} failed on {worker}: {error}")
+        # Only this sweep's runs; the queue may still hold others from earlier, larger sweeps
+        self.all_metrics = queue.results((config['run_id'], config['replication']) for config in run_configs)
+        queue.close()
+
+        self.enforce_cache_limit()
+        self.export_summary()
+        if self.variance_reduction:
+            self.export_paired_differences()
+
+    def enforce_cache_limit(self):
+        """Evict least recently used cached runs once a sweep has finished storing"""
+        cache = ResultCache.from_config(self.base_config)
+        if cache is not None:
+            evicted = cache.evict()
+            if evicted:
+                print(f"Evicted {evicted} cached runs to stay within the cache size limit")
+
+    @staticmethod
+    def replication_status(runs, settings):
+        """Mean and CI half-width of each target over a scenario's replications"""
+        status = {'replications': len(runs), 'converged': True, 'targets': {}}
+        for target in settings['targets']:
+            mean, half_width = confidence_interval([run.get(target) for run in runs], settings['confidence'])
+            limit = settings['tolerance'] * abs(mean) if settings['relative'] else settings['tolerance']
+            converged = half_width <= limit
+            status['targets'][target] = {'mean': mean, 'half_width': half_width, 'converged': converged}
+            status['converged'] = status['converged'] and converged
+        return status
+
+    @staticmethod
+    def _next_batch_size(count, status, settings):
+        """Replications still needed for the widest target, at most doubling the sample"""
+        needed = count
+        for target in status['targets'].values():
+            if target['converged']:
+                continue
+            limit = settings['tolerance'] * abs(target['mean']) if settings['relative'] else settings['tolerance']
+            if limit > 0 and math.isfinite(target['half_width']):
+                # Half-width shrinks as 1/sqrt(n)
+                needed = max(needed, math.ceil(count * (target['half_width'] / limit) ** 2))
+            else:
+                needed = max(needed, 2 * count)
+        extra = min(max(needed - count, 1), count, settings['max_replications'] - count)
+        return max(extra, 1)
+
+    def export_replication_summary(self):
+        """Export per-scenario means, CI half-widths and replication counts"""
+        rows = []
+        for config in self.run_configs:
+            status = self.convergence.get(config['run_id'])
+            if status is None:
+                continue
+            row = {'run_id': config['run_id'], 'purpose': config['purpose'],
+                   'replications': status['replications'], 'converged': status['converged']}
+            for target, values in status['targets'].items():
+                row[f"{target}_mean"] = values['mean']
+                row[f"{target}_half_width"] = values['half_width']
+            rows.append(row)
+        import pandas as pd
+        summary_df = pd.DataFrame(rows)
+        summary_df.to_csv('simulation_runs_m3/replication_summary.csv', index=False)
+
+        print("\n" + "=" * 60)
+        print("REPLICATION SUMMARY")
         print("=" * 60)
+        print(summary_df[['run_id', 'purpose', 'replications', 'converged']].to_string(index=False))
+        return summary_df
+
+    def export_paired_differences(self, targets=None, baseline_run_id=None, confidence=0.95):
+        """Export paired-difference CIs of every scenario against the baseline scenario
+
+        Runs are matched by replication, which under common random numbers saw
+        the same patients with the same draws, so the noise they share cancels.
+        Antithetic pairs are averaged before differencing. independent_half_width
+        shows what an unpaired comparison of the same runs would give.
+        """
+        targets = targets or self.base_config.get('paired_targets', PAIRED_TARGETS)
+        if baseline_run_id is None:
+            baseline_run_id = self.base_config.get('baseline_run_id', self.run_configs[0]['run_id'])
+        pair_size = 2 if self.base_config.get('antithetic') else 1
+
+        by_run = {}
+        for metrics in self.all_metrics:
+            by_run.setdefault(metrics['run_id'], {})[metrics['replication']] = metrics
+        baseline = by_run.get(baseline_run_id, {})
 
+        rows = []
         for config in self.run_configs:
-            from hospital_simulation.enhanced_simulation import EnhancedEmergencyDepartmentSimulation
-            simulation = EnhancedEmergencyDepartmentSimulation(config)
-            metrics = simulation.run(config['run_id'])
+            runs = by_run.get(config['run_id'], {})
+            if config['run_id'] == baseline_run_id or not runs:
+                continue
+            for target in targets:
+                values = {replication: run[target] for replication, run in runs.items() if run.get(target) is not None}
+                reference = {replication: run[target] for replication, run in baseline.items()
+                             if run.get(target) is not None}
+                difference, half_width, independent, pairs = paired_difference(values, reference, confidence, pair_size)
+                rows.append({'run_id': config['run_id'], 'purpose': config['purpose'], 'target': target,
+                             'difference': difference, 'half_width': half_width,
+                             'independent_half_width': independent, 'pairs': pairs})
 
-            # Add run information to metrics
-            metrics['purpose'] = config['purpose']
-            metrics['arrival_rate'] = config['arrival_rate']
-            metrics['num_doctors'] = config['num_doctors']
-            metrics['num_triage_nurses'] = config['num_triage_nurses']
-            metrics['treatment_rate'] = config['treatment_rate']
+        import pandas as pd
+        paired_df = pd.DataFrame(rows)
+        paired_df.to_csv('simulation_runs_m3/paired_differences.csv', index=False)
 
+        print("\n" + "=" * 60)
+        print(f"PAIRED DIFFERENCES AGAINST RUN {baseline_run_id} ({confidence:.0%} CI)")
+        print("=" * 60)
+        if not paired_df.empty:
+            print(paired_df.to_string(index=False))
+        return paired_df
+
+    @staticmethod
+    def _chunksize(num_runs, num_workers):
+        """Batch short runs per task so pool overhead does not dominate large sweeps"""
+        return max(1, num_runs // (num_workers * 4))
+
+    def _collect_results(self, results):
+        """Store and report metrics as runs complete"""
+        for metrics in results:
             self.all_metrics.append(metrics)
+            if self.telemetry is not None:
+                self.telemetry.run_completed(metrics['run_id'], metrics['replication'])
+            if self.verbosity < 1:
+                continue
 
-            print(f"Completed: {config['purpose']}")
+            print(f"Completed: {metrics['purpose']} (replication {metrics['replication']})")
             print(f"  Patients: {metrics['total_patients']}, Avg Time: {metrics['avg_total_time']:.1f} min")
             if 'avg_doctor_utilization' in metrics:
                 print(f"  Doctor Utilization: {metrics['avg_doctor_utilization']:.1%}")
+            if metrics.get('cached'):
+                print("  (reused from the result cache)")
             print("-" * 40)
 
-        # Export summary of all runs
-        self.export_summary()
+    def screen_configurations(self, configs, replications=1, seed=42):
+        """Coarse screening of many configurations with the lockstep NumPy engine
+
+        Returns one summary row per (config, replication) with the config's
+        parameters alongside; nothing is written to disk.
+        """
+        rows = []
+        for metrics in run_lockstep(configs, replications, seed):
+            config = configs[metrics['config_index']]
+            rows.append({
+                'config_index': metrics['config_index'],
+                'replication': metrics['replication'],
+                'purpose': config.get('purpose', ''),
+                'num_triage_nurses': config['num_triage_nurses'],
+                'num_doctors': config['num_doctors'],
+                'arrival_rate': config['arrival_rate'],
+                'triage_rate': config['triage_rate'],
+                'treatment_rate': config['treatment_rate'],
+                'total_patients': metrics.get('total_patients_processed', 0),
+                'avg_total_time': metrics.get('avg_total_time'),
+                'avg_wait_for_treatment': metrics.get('avg_wait_for_treatment'),
+                'avg_doctor_utilization': metrics.get('avg_doctor_utilization'),
+                'throughput': metrics.get('throughput', 0),
+            })
+        import pandas as pd
+        return pd.DataFrame(rows)
 
     def export_summary(self):
         """Export summary of all runs"""
+        import pandas as pd
         summary_df = pd.DataFrame(self.all_metrics)
 
         # Reorder columns for better readability
-        columns_order = ['run_id', 'purpose', 'total_patients', 'avg_total_time',
+        columns_order = ['run_id', 'replication', 'purpose', 'total_patients', 'avg_total_time',
                          'avg_doctor_utilization', 'throughput', 'arrival_rate',
                          'num_doctors', 'num_triage_nurses', 'treatment_rate',
-                         'real_world_duration']
+                         'real_world_duration', 'events_processed', 'simulate_seconds',
+                         'patient_flow_seconds', 'engine_overhead_seconds', 'export_seconds']
 
         # Only include columns that exist
         available_columns = [col for col in columns_order if col in summary_df.columns]
         summary_df = summary_df[available_columns]
 
+        # Add the run summaries to the result store and merge the per-run chunks
+        store = ResultStore.from_config(self.base_config)
+        if store is not None:
+            store.write('runs', {column: summary_df[column].to_numpy() for column in summary_df.columns})
+            store.compact()
+
+        # Pre-screen flags, plus one row without metrics per scenario the pre-screen skipped
+        if self.prescreen:
+            flags = {row['run_id']: row['flag'] for row in self.prescreen}
+            skipped_df = pd.DataFrame([
+                {'run_id': config['run_id'], 'purpose': config['purpose'], 'arrival_rate': config['arrival_rate'],
+                 'num_doctors': config['num_doctors'], 'num_triage_nurses': config['num_triage_nurses'],
+                 'treatment_rate': config['treatment_rate']}
+                for config in self.skipped_configs], columns=summary_df.columns)
+            if not skipped_df.empty:
+                # Nullable integers, so counts and replications stay integers beside the empty cells
+                integers = {column: 'Int64' for column in summary_df.columns if summary_df[column].dtype.kind == 'i'}
+                summary_df = pd.concat([summary_df, skipped_df], ignore_index=True).astype(integers)
+            summary_df['prescreen_flag'] = summary_df['run_id'].map(flags).fillna('')
+
         # Export to CSV
         summary_df.to_csv('simulation_runs_m3/all_runs_summary.csv', index=False)
 
@@ -91,16 +598,36 @@ class SimulationRunManager:
 
         return summary_df
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ED simulation scenarios")
+    parser.add_argument('--queue', help="run through this durable work queue (resumes an interrupted sweep)")
+    parser.add_argument('--join', action='store_true', help="only work on the queue's runs, then exit")
+    parser.add_argument('--optimize-staffing', action='store_true',
+                        help="search for the cheapest staffing meeting the wait-time constraints")
+    args = parser.parse_args(argv)
+
+    if args.join:
+        if not args.queue:
+            parser.error("--join needs --queue")
+        print(f"Completed {run_queue_worker(args.queue)} runs from {args.queue}")
+        return
+
     # Base configuration
     base_config = {
         'output_directory': 'simulation_runs_m3'
     }
+    if args.queue:
+        base_config['work_queue'] = {'path': args.queue}
 
     # Create and run manager
     manager = SimulationRunManager(base_config)
     manager.generate_run_configurations()
-    summary = manager.execute_all_runs()
+    if args.optimize_staffing:
+        manager.optimize_staffing()
+    elif args.queue:
+        manager.execute_queued_runs()
+    else:
+        manager.execute_all_runs()
 
     print(f"\nAll runs completed. Data exported to 'simulation_runs_m3/'")
     print(f"Total runs executed: {len(manager.all_metrics)}")
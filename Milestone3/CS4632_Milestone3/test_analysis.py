@@ -2,31 +2,34 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from hospital_simulation.analysis import analyze_sweep
+from hospital_simulation.result_store import DEFAULT_DIRECTORY, ResultStore
+
 def analyze_test_results():
     """Analyze and create test results report"""
 
     print("=== GENERATING TEST RESULTS ===")
 
     try:
-        # Load the summary data from your simulation runs
-        summary_df = pd.read_csv('simulation_runs_m3/all_runs_summary.csv')
+        # Load the summary data from your simulation runs (the result store when there is one)
+        if (Path(DEFAULT_DIRECTORY) / 'runs').exists():
+            summary_df = ResultStore(DEFAULT_DIRECTORY).read_table('runs')
+        else:
+            summary_df = pd.read_csv('simulation_runs_m3/all_runs_summary.csv')
         print("✅ Found simulation data!")
 
-        # Create a clean CSV file for submission
-        csv_data = []
-        for index, run in summary_df.iterrows():
-            csv_data.append({
-                'Run ID': run['run_id'],
-                'Scenario': run['purpose'],
-                'Total Patients': run['total_patients'],
-                'Avg Time in System (min)': f"{run['avg_total_time']:.1f}",
-                'Doctor Utilization (%)': f"{run['avg_doctor_utilization']:.1%}",
-                'Throughput (patients/hour)': f"{run['throughput'] * 60:.2f}",
-                'Real Duration (seconds)': f"{run['real_world_duration']:.1f}"
-            })
+        # Create a clean CSV file for submission, formatting whole columns at once
+        results_df = pd.DataFrame({
+            'Run ID': summary_df['run_id'],
+            'Scenario': summary_df['purpose'],
+            'Total Patients': summary_df['total_patients'],
+            'Avg Time in System (min)': summary_df['avg_total_time'].map('{:.1f}'.format),
+            'Doctor Utilization (%)': summary_df['avg_doctor_utilization'].map('{:.1%}'.format),
+            'Throughput (patients/hour)': (summary_df['throughput'] * 60).map('{:.2f}'.format),
+            'Real Duration (seconds)': summary_df['real_world_duration'].map('{:.1f}'.format)
+        })
 
         # Save as CSV file
-        results_df = pd.DataFrame(csv_data)
         results_df.to_csv('test_results.csv', index=False)
 
         print("✅ test_results.csv created successfully!")
@@ -36,6 +39,10 @@ def analyze_test_results():
         print("\n📊 TEST RESULTS SUMMARY:")
         print(results_df.to_string(index=False))
 
+        # Per-scenario and per-triage-level statistics from every run's metrics.json
+        analyze_sweep('simulation_runs_m3')
+        print("✅ Scenario and triage level analysis written to simulation_runs_m3/analysis/")
+
         return results_df
 
     except FileNotFoundError: